@@ -1,7 +1,7 @@
 import logging
 from flask import Flask
 from flask_cors import CORS
-from app.models import db
+from app.models import db, engine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -11,18 +11,77 @@ def create_app(config_object="config"):
     app = Flask(__name__)
     app.config.from_object(config_object)
     
+    # List endpoints serialize Row tuples through per-model field plans
+    from app.utils.serialization import ModelJSONProvider
+    app.json = ModelJSONProvider(app)
+    
     # Initialize extensions
+    engine.configure_engines(app)
     db.init_app(app)
+    engine.init_app(app, db)
     CORS(app)
     
+    # In-process display_id and serialized-entity caches, invalidated by ORM events
+    from app.utils import cache
+    cache.init_app(app)
+    
+    # Per-handler latency, status, size and SQL counters, scraped from /metrics
+    from app.utils import metrics
+    metrics.init_app(app, db)
+    
+    # Opt-in SQL profiling: slow-query log with plans, N+1 warnings and a strict query budget
+    from app.utils import profiler
+    profiler.init_app(app, db)
+    
     # Register blueprints
     from app.api.client_routes import client_bp
     from app.api.session_routes import session_bp
     from app.api.document_routes import document_bp
+    from app.api.export_routes import export_bp
+    from app.api.system_routes import system_bp
+    from app.api.search_routes import search_bp
+    from app.api.stats_routes import stats_bp
+    from app.api.metrics_routes import metrics_bp
     
     app.register_blueprint(client_bp, url_prefix='/api')
     app.register_blueprint(session_bp, url_prefix='/api')
     app.register_blueprint(document_bp, url_prefix='/api')
+    app.register_blueprint(export_bp, url_prefix='/api')
+    app.register_blueprint(system_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(stats_bp, url_prefix='/api')
+    # Prometheus scrapes /metrics by default, so this one sits outside /api
+    app.register_blueprint(metrics_bp)
+    
+    # Negotiated gzip/deflate for JSON, NDJSON and text bodies, with compressed bodies cached by ETag
+    from app.utils import compression
+    compression.init_app(app)
+    
+    # Schema migrations: `flask migrations upgrade|status`, optionally applied at startup
+    from app.migrations import applied_migrations, migrations_cli, upgrade
+    app.cli.add_command(migrations_cli)
+    if app.config.get('AUTO_MIGRATE', False):
+        with app.app_context():
+            upgrade(db.engine)
+            versions = [m['version'] for m in applied_migrations(db.engine)]
+            logger.info(f"Applied schema migrations: {versions}")
+    
+    # Dashboard counters: `flask stats rebuild` recounts them from the source tables
+    from app.utils.stats import stats_cli
+    app.cli.add_command(stats_cli)
+    
+    # Full-text search: `flask search rebuild` re-indexes every row, e.g. after a fixtures load
+    from app.utils.search import search_cli
+    app.cli.add_command(search_cli)
+    
+    # Synthetic data at scale: `flask fixtures load --clients 1000000`
+    from app.utils.fixtures import fixtures_cli
+    app.cli.add_command(fixtures_cli)
+    
+    # display_id allocation commits its own short transactions on a dedicated engine
+    from app.utils import id_allocator
+    with app.app_context():
+        id_allocator.init_app(app, db.engines.get(engine.ALLOCATOR_BIND, db.engine))
     
     logger.info("App created and blueprints registered.")
     
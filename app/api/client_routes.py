@@ -3,6 +3,20 @@ from flask import Blueprint, jsonify, request
 from flask_cors import CORS
 from ..models import db
 from ..models.client import Client
+from ..models.document import Document
+from ..models.session import Session
+from datetime import datetime
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from ..utils.cache import cached_dict
+from ..utils.conditional import (
+    add_validators, collection_etag, conflict, entity_etag, not_modified, precondition_failed, resource_validators,
+)
+from ..utils.bulk import error_result, existing_values, lookup_ids, parse_bulk_items, summarize, write_chunks
+from ..utils.id_allocator import next_display_id, next_display_ids
+from ..utils.filtering import CLIENT_LIST
+from ..utils.pagination import keyset_page, ordering, parse_page_args, stream_json_array
+from ..utils.serialization import CLIENT_PLAN
 import uuid
 
 # Configure logging
@@ -16,13 +30,28 @@ CORS(client_bp)
 def get_clients():
     logger.info("Request received to get all clients.")
     try:
-        # Query the database to get all clients
-        clients = Client.query.all()
+        try:
+            criteria, sort = CLIENT_LIST.parse(request.args)
+            page = parse_page_args(request.args, sort)
+        except ValueError as e:
+            logger.warning(f"Invalid list parameters: {e}")
+            return jsonify({"error": str(e)}), 400
 
-        # Convert the client objects to a list of dictionaries for JSON serialization
-        client_list = [client.to_dict() for client in clients]
-        logger.info(f"Successfully retrieved {len(client_list)} clients.")
-        return jsonify(client_list), 200
+        # Answer polling clients from the aggregate alone when nothing has changed
+        etag = collection_etag(Client)
+        cached = not_modified(etag)
+        if cached:
+            logger.info("Clients not modified since last request.")
+            return cached
+
+        if page:
+            limit, after = page
+            result = keyset_page(CLIENT_PLAN.query().filter(*criteria), Client, limit, after, CLIENT_PLAN, sort)
+            logger.info(f"Successfully retrieved a page of {len(result['items'])} clients.")
+            return add_validators(jsonify(result), etag), 200
+
+        # No page requested: stream every client without buffering the table in memory
+        return add_validators(stream_json_array(CLIENT_PLAN.query().filter(*criteria).order_by(*ordering(Client, sort)), CLIENT_PLAN), etag), 200
     except Exception as e:
         logger.error(f"Error retrieving clients: {e}")
         return jsonify({"error": str(e)}), 500
@@ -31,12 +60,26 @@ def get_clients():
 def get_client(client_display_id):
     logger.info(f"Request received to get client with ID: {client_display_id}")
     try:
-        # Query the database to get a specific client by display_id
-        client = Client.query.filter_by(display_id=client_display_id).first()
+        # Check the validators first so unchanged rows are never loaded
+        validators = resource_validators(Client, client_display_id)
+        if validators is None:
+            logger.warning(f"Client with ID {client_display_id} not found.")
+            return jsonify({"error": "Client not found"}), 404
         
-        if client:
+        cached = not_modified(*validators)
+        if cached:
+            logger.info(f"Client with ID {client_display_id} not modified.")
+            return cached
+        
+        # Serve the cached serialization while its ETag still matches the row
+        client_dict = cached_dict(
+            Client, client_display_id, validators[0],
+            lambda: Client.query.filter_by(display_id=client_display_id).first(),
+        )
+        
+        if client_dict:
             logger.info(f"Successfully retrieved client with ID: {client_display_id}")
-            return jsonify(client.to_dict()), 200
+            return add_validators(jsonify(client_dict), *validators), 200
         
         logger.warning(f"Client with ID {client_display_id} not found.")
         return jsonify({"error": "Client not found"}), 404
@@ -61,10 +104,8 @@ def create_client():
             logger.warning(f"Client with email {data.get('email')} already exists.")
             return jsonify({"error": "A client with this email already exists"}), 409
         
-        # Generate display_id
-        max_id_result = db.session.query(db.func.max(Client.id)).first()
-        next_id = 1 if max_id_result[0] is None else max_id_result[0] + 1
-        display_id = f"CLIENT-{next_id:03d}"
+        # Generate display_id from the preallocated sequence block
+        display_id = next_display_id('client')
         
         # Create new client with display_id
         new_client = Client(
@@ -98,6 +139,11 @@ def update_client(client_display_id):
             logger.warning(f"Client with ID {client_display_id} not found.")
             return jsonify({"error": "Client not found"}), 404
         
+        failed = precondition_failed(client)
+        if failed is not None:
+            logger.warning(f"Client with ID {client_display_id} has changed since it was read.")
+            return failed
+        
         # Update client fields
         if 'name' in data:
             client.name = data['name']
@@ -121,7 +167,11 @@ def update_client(client_display_id):
         db.session.commit()
         
         logger.info(f"Successfully updated client with ID: {client_display_id}")
-        return jsonify(client.to_dict()), 200
+        return add_validators(jsonify(client.to_dict()), entity_etag(client)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Client with ID {client_display_id} was modified concurrently.")
+        return conflict("Client")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating client with ID {client_display_id}: {e}")
@@ -137,11 +187,20 @@ def delete_client(client_display_id):
             logger.warning(f"Client with ID {client_display_id} not found.")
             return jsonify({"error": "Client not found"}), 404
         
+        failed = precondition_failed(client)
+        if failed is not None:
+            logger.warning(f"Client with ID {client_display_id} has changed since it was read.")
+            return failed
+        
         db.session.delete(client)
         db.session.commit()
         
         logger.info(f"Successfully deleted client with ID: {client_display_id}")
         return jsonify({"message": "Client deleted successfully"}), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Client with ID {client_display_id} was modified concurrently.")
+        return conflict("Client")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error deleting client with ID {client_display_id}: {e}")
@@ -163,12 +222,122 @@ def update_client_status(client_display_id):
             logger.warning(f"Client with ID {client_display_id} not found.")
             return jsonify({"error": "Client not found"}), 404
         
+        failed = precondition_failed(client)
+        if failed is not None:
+            logger.warning(f"Client with ID {client_display_id} has changed since it was read.")
+            return failed
+        
         client.status = data['status']
         db.session.commit()
         
         logger.info(f"Successfully updated status for client with ID: {client_display_id}")
-        return jsonify(client.to_dict()), 200
+        return add_validators(jsonify(client.to_dict()), entity_etag(client)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Client with ID {client_display_id} was modified concurrently.")
+        return conflict("Client")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating status for client with ID {client_display_id}: {e}")
         return jsonify({"error": str(e)}), 500
+
+@client_bp.route('/clients/bulk', methods=['POST'])
+def bulk_upsert_clients():
+    logger.info("Request received to bulk create/update clients.")
+    try:
+        try:
+            items = parse_bulk_items(request)
+        except ValueError as e:
+            logger.warning(f"Invalid bulk client payload: {e}")
+            return jsonify({"error": str(e)}), 400
+        
+        results = [None] * len(items)
+        fields = {'name': 'name', 'email': 'email', 'phone': 'phone', 'source': 'source', 'status': 'status', 'notes': 'notes'}
+        
+        # Resolve every referenced client and email up front, one IN query each
+        existing = lookup_ids(Client, [item.get('id') for item in items if isinstance(item, dict)], Client.email)
+        taken = existing_values(Client.email, [item.get('email') for item in items if isinstance(item, dict) and item.get('email')])
+        
+        now = datetime.utcnow()
+        claimed = set()
+        creates, updates = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = error_result(index, 400, "Each item must be a JSON object")
+                continue
+            
+            if 'id' in item:
+                row = existing.get(item['id'])
+                if row is None:
+                    results[index] = error_result(index, 404, "Client not found")
+                    continue
+                email = item.get('email', row.email)
+                if email != row.email and (email in taken or email in claimed):
+                    results[index] = error_result(index, 409, "Email is already in use")
+                    continue
+                values = {column: item[key] for key, column in fields.items() if key in item}
+                values.update(id=row.id, updated_at=now)
+                claimed.add(email)
+                updates.append((index, values, row.display_id))
+                continue
+            
+            if not item.get('name') or not item.get('email'):
+                results[index] = error_result(index, 400, "Name and email are required fields")
+                continue
+            if item['email'] in taken or item['email'] in claimed:
+                results[index] = error_result(index, 409, "A client with this email already exists")
+                continue
+            claimed.add(item['email'])
+            creates.append((index, {
+                "name": item['name'],
+                "email": item['email'],
+                "phone": item.get('phone'),
+                "source": item.get('source'),
+                "status": item.get('status', 'Initial Contact'),
+                "notes": item.get('notes'),
+                "created_at": now,
+                "updated_at": now,
+            }))
+        
+        for (_, row), display_id in zip(creates, next_display_ids('client', len(creates))):
+            row['display_id'] = display_id
+        
+        write_chunks(Client, creates, updates, results)
+        summary = summarize(results)
+        logger.info(f"Bulk client request finished: {summary['succeeded']} succeeded, {summary['failed']} failed.")
+        return jsonify(summary), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in bulk client request: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@client_bp.route('/clients/<string:client_display_id>/dossier', methods=['GET'])
+def get_client_dossier(client_display_id):
+    logger.info(f"Request received to get dossier for client with ID: {client_display_id}")
+    try:
+        include_content = request.args.get('content', 'true').lower() not in ('false', '0', 'no')
+        
+        # One query for the client plus one SELECT ... IN per relationship
+        documents_loader = selectinload(Client.documents)
+        if include_content:
+            documents_loader = documents_loader.undefer(Document.content)
+        client = Client.query.options(
+            selectinload(Client.sessions).selectinload(Session.appended_notes), documents_loader
+        ).filter_by(display_id=client_display_id).first()
+        
+        if not client:
+            logger.warning(f"Client with ID {client_display_id} not found.")
+            return jsonify({"error": "Client not found"}), 404
+        
+        dossier = client.to_dict()
+        dossier["sessions"] = [session.to_dict() for session in sorted(client.sessions, key=lambda s: s.date)]
+        dossier["documents"] = [
+            document.to_dict() if include_content else document.to_summary_dict()
+            for document in client.documents
+        ]
+        
+        logger.info(f"Successfully retrieved dossier for client with ID: {client_display_id}")
+        return jsonify(dossier), 200
+    except Exception as e:
+        logger.error(f"Error retrieving dossier for client with ID {client_display_id}: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -1,11 +1,25 @@
 
 import logging
-from flask import Blueprint, jsonify, request
+import zlib
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from ..models import db
 from ..models.document import Document
 from ..models.client import Client
+from ..utils.bulk import error_result, lookup_ids, parse_bulk_items, summarize, write_chunks
+from ..utils.cache import cached_dict, resolve_id
+from ..utils.conditional import (
+    add_validators, collection_etag, conflict, encoded_etag, entity_etag, not_modified, precondition_failed,
+    resource_validators,
+)
+from ..utils.id_allocator import next_display_id, next_display_ids
+from ..utils.filtering import DOCUMENT_LIST
+from ..utils.pagination import keyset_page, ordering, parse_page_args, stream_json_array
+from ..utils.serialization import DOCUMENT_PLAN, DOCUMENT_SUMMARY_PLAN
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import undefer
+from sqlalchemy.orm.exc import StaleDataError
 import uuid
 
 # Configure logging
@@ -15,19 +29,80 @@ logger = logging.getLogger(__name__)
 document_bp = Blueprint('document_routes', __name__)
 CORS(document_bp)
 
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+def _begin_snapshot():
+    # pysqlite only opens a transaction before writes, so without this every read would see
+    # the latest commit. Held until the session is removed once the response is sent, so the
+    # validators, the metadata and every chunk come from the same version of the row.
+    db.session.connection().exec_driver_sql("BEGIN")
+
+def _iter_stored(document_id, start, stop):
+    # Incremental blob I/O reads the bytes of the stored value (TEXT or gzip BLOB) in place,
+    # without loading the whole value for each chunk
+    raw = db.session.connection().connection.driver_connection
+    with raw.blobopen(Document.__tablename__, 'content', document_id, readonly=True) as blob:
+        blob.seek(start)
+        position = start
+        while position < stop:
+            chunk = blob.read(min(DOWNLOAD_CHUNK_SIZE, stop - position))
+            position += len(chunk)
+            yield chunk
+
+def _iter_decompressed(document_id, stored_length, start, stop):
+    # Inflate the stored gzip stream chunk by chunk and emit only bytes [start, stop)
+    decompressor = zlib.decompressobj(wbits=31)
+    position = 0
+    for chunk in _iter_stored(document_id, 0, stored_length):
+        data = decompressor.decompress(chunk)
+        if position + len(data) > start:
+            yield data[max(0, start - position):stop - position]
+        position += len(data)
+        if position >= stop:
+            break
+
+def _if_range_matches(etag):
+    if_range = request.if_range
+    if if_range.etag is None and if_range.date is None:
+        return True
+    return if_range.etag == etag
+
+def _list_view(args):
+    # Lists return summaries (content length and hash, no body) unless ?view=full is given
+    view = args.get('view', 'summary')
+    if view == 'summary':
+        return DOCUMENT_SUMMARY_PLAN
+    if view == 'full':
+        return DOCUMENT_PLAN
+    raise ValueError("view must be 'summary' or 'full'")
+
 @document_bp.route('/documents', methods=['GET'])
 def get_documents():
     logger.info("Request received to get all documents.")
     try:
-        documents = Document.query.all()
-        document_list = [document.to_dict() for document in documents]
-        
-        if document_list:
-            logger.info(f"Successfully retrieved {len(document_list)} documents.")
-            return jsonify(document_list), 200
-        else:
-            logger.info("No documents found.")
-            return jsonify([]), 200
+        try:
+            criteria, sort = DOCUMENT_LIST.parse(request.args, reserved=('view',))
+            page = parse_page_args(request.args, sort)
+            plan = _list_view(request.args)
+        except ValueError as e:
+            logger.warning(f"Invalid list parameters: {e}")
+            return jsonify({"error": str(e)}), 400
+
+        # Answer polling clients from the aggregate alone when nothing has changed
+        etag = collection_etag(Document)
+        cached = not_modified(etag)
+        if cached:
+            logger.info("Documents not modified since last request.")
+            return cached
+
+        if page:
+            limit, after = page
+            result = keyset_page(plan.query().filter(*criteria), Document, limit, after, plan, sort)
+            logger.info(f"Successfully retrieved a page of {len(result['items'])} documents.")
+            return add_validators(jsonify(result), etag), 200
+
+        # No page requested: stream every document without buffering the table in memory
+        return add_validators(stream_json_array(plan.query().filter(*criteria).order_by(*ordering(Document, sort)), plan), etag), 200
     except Exception as e:
         logger.error(f"Error retrieving documents: {e}")
         return jsonify({"error": str(e)}), 500
@@ -36,11 +111,27 @@ def get_documents():
 def get_document(document_display_id):
     logger.info(f"Request received to get document with ID: {document_display_id}")
     try:
-        document = Document.query.filter_by(display_id=document_display_id).first()
+        # Check the validators first so unchanged rows are never loaded
+        validators = resource_validators(Document, document_display_id)
+        if validators is None:
+            logger.warning(f"Document with ID {document_display_id} not found.")
+            return jsonify({"error": "Document not found"}), 404
         
-        if document:
+        cached = not_modified(*validators)
+        if cached:
+            logger.info(f"Document with ID {document_display_id} not modified.")
+            return cached
+        
+        # Serve the cached serialization while its ETag still matches the row
+        document_dict = cached_dict(
+            Document, document_display_id, validators[0],
+            lambda: Document.with_client().options(undefer(Document.content)).filter_by(display_id=document_display_id).first(),
+            content=lambda: db.session.query(Document.content).filter_by(display_id=document_display_id).scalar(),
+        )
+        
+        if document_dict:
             logger.info(f"Successfully retrieved document with ID: {document_display_id}")
-            return jsonify(document.to_dict()), 200
+            return add_validators(jsonify(document_dict), *validators), 200
         
         logger.warning(f"Document with ID {document_display_id} not found.")
         return jsonify({"error": "Document not found"}), 404
@@ -52,17 +143,28 @@ def get_document(document_display_id):
 def get_client_documents(client_display_id):
     logger.info(f"Request received to get documents for client with ID: {client_display_id}")
     try:
+        try:
+            plan = _list_view(request.args)
+        except ValueError as e:
+            logger.warning(f"Invalid list parameters: {e}")
+            return jsonify({"error": str(e)}), 400
+        
         # Check if client exists
-        client = Client.query.filter_by(display_id=client_display_id).first()
-        if not client:
+        client_id = resolve_id(Client, client_display_id)
+        if client_id is None:
             logger.warning(f"Client with ID {client_display_id} not found.")
             return jsonify({"error": "Client not found"}), 404
         
-        documents = Document.query.filter_by(client_id=client.id).all()
-        document_list = [document.to_dict() for document in documents]
+        etag = collection_etag(Document, Document.client_id == client_id)
+        cached = not_modified(etag)
+        if cached:
+            logger.info(f"Documents for client with ID {client_display_id} not modified.")
+            return cached
         
-        logger.info(f"Successfully retrieved {len(document_list)} documents for client with ID: {client_display_id}")
-        return jsonify(document_list), 200
+        documents = plan.query().filter(Document.client_id == client_id).all()
+        
+        logger.info(f"Successfully retrieved {len(documents)} documents for client with ID: {client_display_id}")
+        return add_validators(jsonify(plan.rows(documents)), etag), 200
     except Exception as e:
         logger.error(f"Error retrieving documents for client with ID {client_display_id}: {e}")
         return jsonify({"error": str(e)}), 500
@@ -80,19 +182,17 @@ def create_document():
         
         # Check if client exists
         client_display_id = data.get('clientId')
-        client = Client.query.filter_by(display_id=client_display_id).first()
-        if not client:
+        client_id = resolve_id(Client, client_display_id, fresh=True)
+        if client_id is None:
             logger.warning(f"Client with ID {client_display_id} not found.")
             return jsonify({"error": "Client not found"}), 404
         
-        # Generate display_id
-        max_id_result = db.session.query(db.func.max(Document.id)).first()
-        next_id = 1 if max_id_result[0] is None else max_id_result[0] + 1
-        display_id = f"DOCUMENT-{next_id:03d}"
+        # Generate display_id from the preallocated sequence block
+        display_id = next_display_id('document')
         
         # Create new document with display_id
         new_document = Document(
-            client_id=client.id,
+            client_id=client_id,
             type=data.get('type'),
             content=data.get('content'),
             sent=data.get('sent', False),
@@ -121,14 +221,19 @@ def update_document(document_display_id):
             logger.warning(f"Document with ID {document_display_id} not found.")
             return jsonify({"error": "Document not found"}), 404
         
+        failed = precondition_failed(document)
+        if failed is not None:
+            logger.warning(f"Document with ID {document_display_id} has changed since it was read.")
+            return failed
+        
         # Update document fields
         if 'clientId' in data:
             client_display_id = data['clientId']
-            client = Client.query.filter_by(display_id=client_display_id).first()
-            if not client:
+            client_id = resolve_id(Client, client_display_id, fresh=True)
+            if client_id is None:
                 logger.warning(f"Client with ID {client_display_id} not found.")
                 return jsonify({"error": "Client not found"}), 404
-            document.client_id = client.id
+            document.client_id = client_id
             
         if 'type' in data:
             document.type = data['type']
@@ -152,7 +257,11 @@ def update_document(document_display_id):
         db.session.commit()
         
         logger.info(f"Successfully updated document with ID: {document_display_id}")
-        return jsonify(document.to_dict()), 200
+        return add_validators(jsonify(document.to_dict()), entity_etag(document)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Document with ID {document_display_id} was modified concurrently.")
+        return conflict("Document")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating document with ID {document_display_id}: {e}")
@@ -168,11 +277,20 @@ def delete_document(document_display_id):
             logger.warning(f"Document with ID {document_display_id} not found.")
             return jsonify({"error": "Document not found"}), 404
         
+        failed = precondition_failed(document)
+        if failed is not None:
+            logger.warning(f"Document with ID {document_display_id} has changed since it was read.")
+            return failed
+        
         db.session.delete(document)
         db.session.commit()
         
         logger.info(f"Successfully deleted document with ID: {document_display_id}")
         return jsonify({"message": "Document deleted successfully"}), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Document with ID {document_display_id} was modified concurrently.")
+        return conflict("Document")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error deleting document with ID {document_display_id}: {e}")
@@ -188,12 +306,21 @@ def send_document(document_display_id):
             logger.warning(f"Document with ID {document_display_id} not found.")
             return jsonify({"error": "Document not found"}), 404
         
+        failed = precondition_failed(document)
+        if failed is not None:
+            logger.warning(f"Document with ID {document_display_id} has changed since it was read.")
+            return failed
+        
         document.sent = True
         document.sent_date = datetime.utcnow()
         db.session.commit()
         
         logger.info(f"Successfully marked document with ID {document_display_id} as sent.")
-        return jsonify(document.to_dict()), 200
+        return add_validators(jsonify(document.to_dict()), entity_etag(document)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Document with ID {document_display_id} was modified concurrently.")
+        return conflict("Document")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error marking document with ID {document_display_id} as sent: {e}")
@@ -209,12 +336,21 @@ def unsend_document(document_display_id):
             logger.warning(f"Document with ID {document_display_id} not found.")
             return jsonify({"error": "Document not found"}), 404
         
+        failed = precondition_failed(document)
+        if failed is not None:
+            logger.warning(f"Document with ID {document_display_id} has changed since it was read.")
+            return failed
+        
         document.sent = False
         document.sent_date = None
         db.session.commit()
         
         logger.info(f"Successfully marked document with ID {document_display_id} as unsent.")
-        return jsonify(document.to_dict()), 200
+        return add_validators(jsonify(document.to_dict()), entity_etag(document)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Document with ID {document_display_id} was modified concurrently.")
+        return conflict("Document")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error marking document with ID {document_display_id} as unsent: {e}")
@@ -224,18 +360,162 @@ def unsend_document(document_display_id):
 def download_document(document_display_id):
     logger.info(f"Request received to download document with ID: {document_display_id}")
     try:
-        document = Document.query.filter_by(display_id=document_display_id).first()
-        
-        if not document:
+        _begin_snapshot()
+        validators = resource_validators(Document, document_display_id)
+        if validators is None:
             logger.warning(f"Document with ID {document_display_id} not found.")
             return jsonify({"error": "Document not found"}), 404
         
-        # In a real application, you would generate a file and return it
-        # For now, we'll just return the document content
-        return jsonify({
-            "content": document.content,
-            "filename": f"{document.type.replace(' ', '_').lower()}_{document.display_id}.txt"
-        }), 200
+        # Only metadata here; the body is read chunk by chunk while the response streams.
+        # Bodies stored compressed are BLOBs, whose length() is the compressed size.
+        document = db.session.query(
+            Document.id, Document.type, Document.content_length,
+            func.typeof(Document.content).label('storage'),
+            func.length(Document.content).label('stored_length'),
+        ).filter(Document.display_id == document_display_id).first()
+        compressed = document.storage == 'blob'
+        total = document.content_length
+        if total is None:
+            total = Document.fingerprint(db.session.get(Document, document.id).content)[0]
+        
+        etag, last_modified = validators
+        filename = f"{document.type.replace(' ', '_').lower()}_{document_display_id}.txt"
+        headers = {
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Accept-Ranges": "bytes",
+            "Vary": "Accept-Encoding",
+        }
+        
+        # A compressed body can go out exactly as stored when the client takes gzip
+        # and wants the whole thing; it is a different representation, so it gets its own tag
+        if compressed and request.range is None and request.accept_encodings["gzip"]:
+            etag = encoded_etag(etag, "gzip")
+            cached = not_modified(etag, last_modified)
+            if cached:
+                logger.info(f"Document with ID {document_display_id} not modified.")
+                return cached
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Length"] = str(document.stored_length)
+            response = Response(
+                stream_with_context(_iter_stored(document.id, 0, document.stored_length)),
+                mimetype="text/plain",
+                headers=headers,
+            )
+            logger.info(f"Streaming stored gzip body of document with ID: {document_display_id}")
+            return add_validators(response, etag, last_modified)
+        
+        cached = not_modified(etag, last_modified)
+        if cached:
+            logger.info(f"Document with ID {document_display_id} not modified.")
+            return cached
+        
+        start, stop, status = 0, total, 200
+        
+        # Honor a single byte range, unless If-Range says the client's copy is outdated
+        byte_range = request.range
+        if byte_range is not None and len(byte_range.ranges) == 1 and _if_range_matches(etag):
+            bounds = byte_range.range_for_length(total)
+            if bounds is None:
+                logger.warning(f"Unsatisfiable range {request.headers.get('Range')} for document {document_display_id}.")
+                headers["Content-Range"] = f"bytes */{total}"
+                return Response(status=416, headers=headers)
+            start, stop = bounds
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{stop - 1}/{total}"
+        
+        if compressed:
+            body = _iter_decompressed(document.id, document.stored_length, start, stop)
+        else:
+            body = _iter_stored(document.id, start, stop)
+        headers["Content-Length"] = str(stop - start)
+        response = Response(stream_with_context(body), status=status, mimetype="text/plain", headers=headers)
+        logger.info(f"Streaming bytes {start}-{stop} of document with ID: {document_display_id}")
+        return add_validators(response, etag, last_modified)
     except Exception as e:
         logger.error(f"Error downloading document with ID {document_display_id}: {e}")
         return jsonify({"error": str(e)}), 500
+
+@document_bp.route('/documents/bulk', methods=['POST'])
+def bulk_upsert_documents():
+    logger.info("Request received to bulk create/update documents.")
+    try:
+        try:
+            items = parse_bulk_items(request)
+        except ValueError as e:
+            logger.warning(f"Invalid bulk document payload: {e}")
+            return jsonify({"error": str(e)}), 400
+        
+        results = [None] * len(items)
+        fields = {'type': 'type', 'sent': 'sent'}
+        
+        # Resolve every referenced document and client with one IN query each
+        objects = [item for item in items if isinstance(item, dict)]
+        existing = lookup_ids(Document, [item.get('id') for item in objects])
+        clients = lookup_ids(Client, [item.get('clientId') for item in objects])
+        
+        now = datetime.utcnow()
+        creates, updates = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = error_result(index, 400, "Each item must be a JSON object")
+                continue
+            
+            if 'id' in item:
+                row = existing.get(item['id'])
+                if row is None:
+                    results[index] = error_result(index, 404, "Document not found")
+                    continue
+                values = {column: item[key] for key, column in fields.items() if key in item}
+            else:
+                if not item.get('clientId') or not item.get('type') or not item.get('content'):
+                    results[index] = error_result(index, 400, "Client ID, type, and content are required fields")
+                    continue
+                values = {
+                    "type": item['type'],
+                    "sent": item.get('sent', False),
+                    "sent_date": None,
+                    "created_at": now,
+                }
+            
+            if 'clientId' in item:
+                client = clients.get(item['clientId'])
+                if client is None:
+                    results[index] = error_result(index, 404, "Client not found")
+                    continue
+                values['client_id'] = client.id
+            
+            if 'content' in item:
+                if not isinstance(item['content'], str):
+                    results[index] = error_result(index, 400, "Content must be a string")
+                    continue
+                # Executemany skips the model's validators, so fingerprint the body here
+                values['content'] = item['content']
+                values['content_length'], values['content_hash'] = Document.fingerprint(item['content'])
+            
+            if item.get('sentDate'):
+                try:
+                    values['sent_date'] = datetime.fromisoformat(item['sentDate'].replace('Z', '+00:00'))
+                except (AttributeError, ValueError):
+                    results[index] = error_result(index, 400, "Invalid date format. Use ISO format (e.g., 2023-01-01T12:00:00Z)")
+                    continue
+            elif 'sentDate' in item:
+                values['sent_date'] = None
+            
+            values['updated_at'] = now
+            if 'id' in item:
+                values['id'] = row.id
+                updates.append((index, values, row.display_id))
+            else:
+                creates.append((index, values))
+        
+        for (_, row), display_id in zip(creates, next_display_ids('document', len(creates))):
+            row['display_id'] = display_id
+        
+        write_chunks(Document, creates, updates, results)
+        summary = summarize(results)
+        logger.info(f"Bulk document request finished: {summary['succeeded']} succeeded, {summary['failed']} failed.")
+        return jsonify(summary), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in bulk document request: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,98 @@
+import logging
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_cors import CORS
+from sqlalchemy import or_, select
+from sqlalchemy.orm import selectinload, undefer
+from ..models import db
+from ..models.client import Client
+from ..models.document import Document
+from ..models.session import Session
+from ..utils.pagination import dumps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+export_bp = Blueprint('export_routes', __name__)
+CORS(export_bp)
+
+EXPORT_BATCH_SIZE = 500
+
+def _client_batches(updated_since):
+    query = select(Client).order_by(Client.id)
+    if updated_since is not None:
+        # A client is exported when it, or any of its sessions or documents, changed
+        query = query.where(or_(
+            Client.updated_at >= updated_since,
+            select(Session.id).where(Session.client_id == Client.id, Session.updated_at >= updated_since).exists(),
+            select(Document.id).where(Document.client_id == Client.id, Document.updated_at >= updated_since).exists(),
+        ))
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    return result.scalars().partitions()
+
+def _export_lines(updated_since):
+    count = 0
+    for clients in _client_batches(updated_since):
+        # Fetch the children of the whole batch with one query per table
+        ids = [client.id for client in clients]
+        children = Session.query.options(selectinload(Session.appended_notes)).filter(Session.client_id.in_(ids)).order_by(Session.client_id, Session.date).all()
+        sessions = defaultdict(list)
+        for session in children:
+            sessions[session.client_id].append(session.to_dict())
+        documents = defaultdict(list)
+        for document in Document.query.options(undefer(Document.content)).filter(Document.client_id.in_(ids)).order_by(Document.client_id, Document.id):
+            documents[document.client_id].append(document.to_dict())
+            children.append(document)
+
+        lines = []
+        for client in clients:
+            record = client.to_dict()
+            record["sessions"] = sessions[client.id]
+            record["documents"] = documents[client.id]
+            lines.append(dumps(record))
+        count += len(lines)
+        yield "\n".join(lines) + "\n"
+
+        # Drop the batch from the identity map so memory stays flat across the export
+        for obj in clients + children:
+            db.session.expunge(obj)
+    logger.info(f"Exported {count} clients.")
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        # Flush per batch so the consumer can start decoding before the export ends
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@export_bp.route('/export', methods=['GET'])
+def export_data():
+    logger.info("Request received to export all clients.")
+    try:
+        updated_since = None
+        if request.args.get('updated_since'):
+            try:
+                updated_since = datetime.fromisoformat(request.args['updated_since'].replace('Z', '+00:00'))
+            except ValueError:
+                logger.warning(f"Invalid updated_since: {request.args['updated_since']}")
+                return jsonify({"error": "Invalid date format. Use ISO format (e.g., 2023-01-01T12:00:00Z)"}), 400
+            # Timestamps are stored as naive UTC
+            if updated_since.tzinfo is not None:
+                updated_since = (updated_since - updated_since.utcoffset()).replace(tzinfo=None)
+
+        body = _export_lines(updated_since)
+        headers = {"Content-Disposition": "attachment; filename=export.ndjson", "Vary": "Accept-Encoding"}
+        if request.accept_encodings["gzip"]:
+            body = _gzip(body)
+            headers["Content-Encoding"] = "gzip"
+
+        return Response(stream_with_context(body), mimetype="application/x-ndjson", headers=headers), 200
+    except Exception as e:
+        logger.error(f"Error exporting clients: {e}")
+        return jsonify({"error": str(e)}), 500
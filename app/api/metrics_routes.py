@@ -0,0 +1,22 @@
+import logging
+from flask import Blueprint, Response, current_app, jsonify
+from ..utils.metrics import PROMETHEUS_MIMETYPE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+metrics_bp = Blueprint('metrics_routes', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Scraped every few seconds, so this doesn't log at INFO
+    try:
+        metrics = current_app.extensions.get('metrics')
+        if metrics is None:
+            logger.warning("Metrics were requested but METRICS_ENABLED is off.")
+            return jsonify({"error": "Metrics are disabled"}), 404
+        return Response(metrics.render(), mimetype=PROMETHEUS_MIMETYPE), 200
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        return jsonify({"error": str(e)}), 500
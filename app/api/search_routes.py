@@ -0,0 +1,63 @@
+import logging
+from flask import Blueprint, jsonify, request
+from flask_cors import CORS
+from ..models.client import Client
+from ..utils.cache import resolve_id
+from ..utils.search import DEFAULT_SEARCH_LIMIT, KINDS, MAX_SEARCH_LIMIT, search
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+search_bp = Blueprint('search_routes', __name__)
+CORS(search_bp)
+
+def _parse_search_args(args):
+    q = args.get('q', '').strip()
+    if not q:
+        raise ValueError("q is required")
+
+    kind = args.get('type')
+    if kind is not None and kind not in KINDS:
+        raise ValueError(f"type must be one of: {', '.join(KINDS)}")
+
+    try:
+        limit = int(args.get('limit', DEFAULT_SEARCH_LIMIT))
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        raise ValueError("limit and offset must be integers")
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+
+    return q, kind, limit, offset
+
+@search_bp.route('/search', methods=['GET'])
+def search_notes():
+    logger.info(f"Request received to search for: {request.args.get('q')}")
+    try:
+        try:
+            q, kind, limit, offset = _parse_search_args(request.args)
+        except ValueError as e:
+            logger.warning(f"Invalid search parameters: {e}")
+            return jsonify({"error": str(e)}), 400
+
+        client_id = None
+        if request.args.get('clientId'):
+            client_id = resolve_id(Client, request.args['clientId'])
+            if client_id is None:
+                logger.warning(f"Client with ID {request.args['clientId']} not found.")
+                return jsonify({"error": "Client not found"}), 404
+
+        try:
+            results = search(q, kind=kind, client_id=client_id, limit=limit, offset=offset)
+        except ValueError as e:
+            logger.warning(f"Invalid search query: {e}")
+            return jsonify({"error": str(e)}), 400
+
+        logger.info(f"Search returned {len(results)} results.")
+        return jsonify({"items": results, "limit": limit, "offset": offset}), 200
+    except Exception as e:
+        logger.error(f"Error searching: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -3,8 +3,24 @@ from flask import Blueprint, jsonify, request
 from flask_cors import CORS
 from ..models import db
 from ..models.session import Session
+from ..models.session_note import SessionNote
 from ..models.client import Client
-from datetime import datetime
+from ..utils.bulk import error_result, lookup_ids, parse_bulk_items, summarize, write_chunks
+from ..utils.cache import cached_dict, cached_feed_etag, invalidate, resolve_id
+from ..utils.conditional import (
+    add_validators, collection_etag, conflict, entity_etag, make_etag, not_modified, precondition_failed,
+    resource_validators, write_marker,
+)
+from ..utils.id_allocator import next_display_id, next_display_ids
+from ..utils.filtering import SESSION_LIST, parse_value
+from ..utils.ical import ICS_MIMETYPE, feed_query, render_feed
+from ..utils.pagination import keyset_page, ordering, parse_page_args, stream_json_array
+from ..utils.search import unindex_notes
+from ..utils.serialization import CALENDAR_PLAN, SESSION_PLAN
+from datetime import datetime, timedelta
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import delete
+from sqlalchemy.orm.exc import StaleDataError
 import uuid
 
 # Configure logging
@@ -14,32 +30,153 @@ logger = logging.getLogger(__name__)
 session_bp = Blueprint('session_routes', __name__)
 CORS(session_bp)
 
+MAX_CALENDAR_DAYS = 366
+
+def _calendar_window(args):
+    if not args.get('from') or not args.get('to'):
+        raise ValueError("from and to are required")
+    start = parse_value(Session.date, args['from'])
+    end = parse_value(Session.date, args['to'])
+    if end <= start:
+        raise ValueError("to must be after from")
+    if end - start > timedelta(days=MAX_CALENDAR_DAYS):
+        raise ValueError(f"The window can span at most {MAX_CALENDAR_DAYS} days")
+    return start, end
+
+def _feed_response(name, client_id=None):
+    # Past sessions drop out a day at a time, so the start of the window is part of the ETag
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    since = today - timedelta(days=current_app.config.get('ICS_PAST_DAYS', 30))
+    
+    # Polling calendar apps are answered from the cached ETag until a session or client changes,
+    # which the write marker shows whichever worker made the change
+    def compute():
+        sessions = [Session.date >= since]
+        clients = []
+        if client_id is not None:
+            sessions.append(Session.client_id == client_id)
+            clients.append(Client.id == client_id)
+        return make_etag(collection_etag(Session, *sessions), collection_etag(Client, *clients), since)
+    
+    etag = cached_feed_etag((request.path, since), write_marker(Session, Client), compute)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    body = render_feed(feed_query(since, client_id), name(), current_app.config.get('ICS_SESSION_MINUTES', 60), since)
+    response = Response(stream_with_context(body), mimetype=ICS_MIMETYPE)
+    return add_validators(response, etag)
+
 @session_bp.route('/sessions', methods=['GET'])
 def get_sessions():
     logger.info("Request received to get all sessions.")
     try:
-        sessions = Session.query.all()
-        session_list = [session.to_dict() for session in sessions]
-        
-        if session_list:
-            logger.info(f"Successfully retrieved {len(session_list)} sessions.")
-            return jsonify(session_list), 200
-        else:
-            logger.info("No sessions found.")
-            return jsonify([]), 200
+        try:
+            criteria, sort = SESSION_LIST.parse(request.args)
+            page = parse_page_args(request.args, sort)
+        except ValueError as e:
+            logger.warning(f"Invalid list parameters: {e}")
+            return jsonify({"error": str(e)}), 400
+
+        # Answer polling clients from the aggregate alone when nothing has changed
+        etag = collection_etag(Session)
+        cached = not_modified(etag)
+        if cached:
+            logger.info("Sessions not modified since last request.")
+            return cached
+
+        if page:
+            limit, after = page
+            result = keyset_page(SESSION_PLAN.query().filter(*criteria), Session, limit, after, SESSION_PLAN, sort)
+            logger.info(f"Successfully retrieved a page of {len(result['items'])} sessions.")
+            return add_validators(jsonify(result), etag), 200
+
+        # No page requested: stream every session without buffering the table in memory
+        return add_validators(stream_json_array(SESSION_PLAN.query().filter(*criteria).order_by(*ordering(Session, sort)), SESSION_PLAN), etag), 200
     except Exception as e:
         logger.error(f"Error retrieving sessions: {e}")
         return jsonify({"error": str(e)}), 500
 
+@session_bp.route('/sessions/calendar', methods=['GET'])
+def get_session_calendar():
+    logger.info(f"Request received to get sessions from {request.args.get('from')} to {request.args.get('to')}.")
+    try:
+        try:
+            start, end = _calendar_window(request.args)
+        except ValueError as e:
+            logger.warning(f"Invalid calendar window: {e}")
+            return jsonify({"error": str(e)}), 400
+        
+        # Client names are shown in the calendar, so client edits change the tag too
+        etag = make_etag(collection_etag(Session), collection_etag(Client))
+        cached = not_modified(etag)
+        if cached:
+            logger.info("Calendar not modified since last request.")
+            return cached
+        
+        sessions = (
+            CALENDAR_PLAN.query()
+            .filter(Session.date >= start, Session.date < end)
+            .order_by(Session.date, Session.id)
+            .all()
+        )
+        
+        logger.info(f"Successfully retrieved {len(sessions)} sessions for the calendar.")
+        return add_validators(jsonify(CALENDAR_PLAN.rows(sessions)), etag), 200
+    except Exception as e:
+        logger.error(f"Error retrieving calendar: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@session_bp.route('/sessions/calendar.ics', methods=['GET'])
+def get_calendar_feed():
+    logger.info("Request received for the sessions calendar feed.")
+    try:
+        return _feed_response(lambda: "Mylo sessions")
+    except Exception as e:
+        logger.error(f"Error generating calendar feed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@session_bp.route('/clients/<string:client_display_id>/sessions.ics', methods=['GET'])
+def get_client_calendar_feed(client_display_id):
+    logger.info(f"Request received for the calendar feed of client with ID: {client_display_id}")
+    try:
+        client_id = resolve_id(Client, client_display_id)
+        if client_id is None:
+            logger.warning(f"Client with ID {client_display_id} not found.")
+            return jsonify({"error": "Client not found"}), 404
+        
+        return _feed_response(
+            lambda: f"Mylo sessions - {db.session.query(Client.name).filter(Client.id == client_id).scalar()}",
+            client_id,
+        )
+    except Exception as e:
+        logger.error(f"Error generating calendar feed for client with ID {client_display_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @session_bp.route('/sessions/<string:session_display_id>', methods=['GET'])
 def get_session(session_display_id):
     logger.info(f"Request received to get session with ID: {session_display_id}")
     try:
-        session = Session.query.filter_by(display_id=session_display_id).first()
+        # Check the validators first so unchanged rows are never loaded
+        validators = resource_validators(Session, session_display_id)
+        if validators is None:
+            logger.warning(f"Session with ID {session_display_id} not found.")
+            return jsonify({"error": "Session not found"}), 404
+        
+        cached = not_modified(*validators)
+        if cached:
+            logger.info(f"Session with ID {session_display_id} not modified.")
+            return cached
+        
+        # Serve the cached serialization while its ETag still matches the row
+        session_dict = cached_dict(
+            Session, session_display_id, validators[0],
+            lambda: Session.with_client().filter_by(display_id=session_display_id).first(),
+        )
         
-        if session:
+        if session_dict:
             logger.info(f"Successfully retrieved session with ID: {session_display_id}")
-            return jsonify(session.to_dict()), 200
+            return add_validators(jsonify(session_dict), *validators), 200
         
         logger.warning(f"Session with ID {session_display_id} not found.")
         return jsonify({"error": "Session not found"}), 404
@@ -52,16 +189,21 @@ def get_client_sessions(client_display_id):
     logger.info(f"Request received to get sessions for client with ID: {client_display_id}")
     try:
         # Check if client exists
-        client = Client.query.filter_by(display_id=client_display_id).first()
-        if not client:
+        client_id = resolve_id(Client, client_display_id)
+        if client_id is None:
             logger.warning(f"Client with ID {client_display_id} not found.")
             return jsonify({"error": "Client not found"}), 404
         
-        sessions = Session.query.filter_by(client_id=client.id).all()
-        session_list = [session.to_dict() for session in sessions]
+        etag = collection_etag(Session, Session.client_id == client_id)
+        cached = not_modified(etag)
+        if cached:
+            logger.info(f"Sessions for client with ID {client_display_id} not modified.")
+            return cached
         
-        logger.info(f"Successfully retrieved {len(session_list)} sessions for client with ID: {client_display_id}")
-        return jsonify(session_list), 200
+        sessions = SESSION_PLAN.query().filter(Session.client_id == client_id).all()
+        
+        logger.info(f"Successfully retrieved {len(sessions)} sessions for client with ID: {client_display_id}")
+        return add_validators(jsonify(SESSION_PLAN.rows(sessions)), etag), 200
     except Exception as e:
         logger.error(f"Error retrieving sessions for client with ID {client_display_id}: {e}")
         return jsonify({"error": str(e)}), 500
@@ -79,8 +221,8 @@ def create_session():
         
         # Check if client exists
         client_display_id = data.get('clientId')
-        client = Client.query.filter_by(display_id=client_display_id).first()
-        if not client:
+        client_id = resolve_id(Client, client_display_id, fresh=True)
+        if client_id is None:
             logger.warning(f"Client with ID {client_display_id} not found.")
             return jsonify({"error": "Client not found"}), 404
         
@@ -91,14 +233,12 @@ def create_session():
             logger.warning(f"Invalid date format: {data.get('date')}")
             return jsonify({"error": "Invalid date format. Use ISO format (e.g., 2023-01-01T12:00:00Z)"}), 400
         
-        # Generate display_id
-        max_id_result = db.session.query(db.func.max(Session.id)).first()
-        next_id = 1 if max_id_result[0] is None else max_id_result[0] + 1
-        display_id = f"SESSION-{next_id:03d}"
+        # Generate display_id from the preallocated sequence block
+        display_id = next_display_id('session')
         
         # Create new session with display_id
         new_session = Session(
-            client_id=client.id,
+            client_id=client_id,
             session_number=data.get('sessionNumber'),
             date=date,
             category=data.get('category', 'Initial Consultation'),
@@ -129,14 +269,19 @@ def update_session(session_display_id):
             logger.warning(f"Session with ID {session_display_id} not found.")
             return jsonify({"error": "Session not found"}), 404
         
+        failed = precondition_failed(session)
+        if failed is not None:
+            logger.warning(f"Session with ID {session_display_id} has changed since it was read.")
+            return failed
+        
         # Update session fields
         if 'clientId' in data:
             client_display_id = data['clientId']
-            client = Client.query.filter_by(display_id=client_display_id).first()
-            if not client:
+            client_id = resolve_id(Client, client_display_id, fresh=True)
+            if client_id is None:
                 logger.warning(f"Client with ID {client_display_id} not found.")
                 return jsonify({"error": "Client not found"}), 404
-            session.client_id = client.id
+            session.client_id = client_id
             
         if 'sessionNumber' in data:
             session.session_number = data['sessionNumber']
@@ -152,7 +297,9 @@ def update_session(session_display_id):
             session.completed = data['completed']
             
         if 'notes' in data:
+            # Replacing the notes replaces anything appended since, too
             session.notes = data['notes']
+            session.appended_notes.clear()
             
         if 'category' in data:
             session.category = data['category']
@@ -163,7 +310,11 @@ def update_session(session_display_id):
         db.session.commit()
         
         logger.info(f"Successfully updated session with ID: {session_display_id}")
-        return jsonify(session.to_dict()), 200
+        return add_validators(jsonify(session.to_dict()), entity_etag(session)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Session with ID {session_display_id} was modified concurrently.")
+        return conflict("Session")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating session with ID {session_display_id}: {e}")
@@ -179,11 +330,20 @@ def delete_session(session_display_id):
             logger.warning(f"Session with ID {session_display_id} not found.")
             return jsonify({"error": "Session not found"}), 404
         
+        failed = precondition_failed(session)
+        if failed is not None:
+            logger.warning(f"Session with ID {session_display_id} has changed since it was read.")
+            return failed
+        
         db.session.delete(session)
         db.session.commit()
         
         logger.info(f"Successfully deleted session with ID: {session_display_id}")
         return jsonify({"message": "Session deleted successfully"}), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Session with ID {session_display_id} was modified concurrently.")
+        return conflict("Session")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error deleting session with ID {session_display_id}: {e}")
@@ -199,11 +359,20 @@ def complete_session(session_display_id):
             logger.warning(f"Session with ID {session_display_id} not found.")
             return jsonify({"error": "Session not found"}), 404
         
+        failed = precondition_failed(session)
+        if failed is not None:
+            logger.warning(f"Session with ID {session_display_id} has changed since it was read.")
+            return failed
+        
         session.completed = True
         db.session.commit()
         
         logger.info(f"Successfully marked session with ID {session_display_id} as completed.")
-        return jsonify(session.to_dict()), 200
+        return add_validators(jsonify(session.to_dict()), entity_etag(session)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Session with ID {session_display_id} was modified concurrently.")
+        return conflict("Session")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error marking session with ID {session_display_id} as completed: {e}")
@@ -225,11 +394,20 @@ def set_zoom_link(session_display_id):
             logger.warning(f"Session with ID {session_display_id} not found.")
             return jsonify({"error": "Session not found"}), 404
         
+        failed = precondition_failed(session)
+        if failed is not None:
+            logger.warning(f"Session with ID {session_display_id} has changed since it was read.")
+            return failed
+        
         session.zoom_link = data['zoomLink']
         db.session.commit()
         
         logger.info(f"Successfully set zoom link for session with ID: {session_display_id}")
-        return jsonify(session.to_dict()), 200
+        return add_validators(jsonify(session.to_dict()), entity_etag(session)), 200
+    except StaleDataError:
+        db.session.rollback()
+        logger.warning(f"Session with ID {session_display_id} was modified concurrently.")
+        return conflict("Session")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error setting zoom link for session with ID {session_display_id}: {e}")
@@ -245,23 +423,116 @@ def add_notes(session_display_id):
             logger.warning("Missing notes in request.")
             return jsonify({"error": "Notes are required"}), 400
         
+        # Hold the write lock from the lookup to the commit, so the session can't change or go
+        # away between the If-Match check and the append
+        db.session.connection().exec_driver_sql("BEGIN IMMEDIATE")
         session = Session.query.filter_by(display_id=session_display_id).first()
         
         if not session:
             logger.warning(f"Session with ID {session_display_id} not found.")
+            db.session.rollback()
             return jsonify({"error": "Session not found"}), 404
         
-        # Append new notes to existing notes
-        if session.notes:
-            session.notes += f"\n{data['notes']}"
-        else:
-            session.notes = data['notes']
-            
+        failed = precondition_failed(session)
+        if failed is not None:
+            logger.warning(f"Session with ID {session_display_id} has changed since it was read.")
+            db.session.rollback()
+            return failed
+        
+        # Each append is a new row, so the existing notes are never read or rewritten and
+        # concurrent appends can't overwrite one another. The session row is left alone too:
+        # its ETag and Last-Modified follow the latest note (see conditional.APPENDED).
+        db.session.add(SessionNote(session.id, data['notes']))
         db.session.commit()
+        # Appends don't touch the session row, so no mapper event drops its cached copies
+        invalidate('sessions', session_display_id)
         
         logger.info(f"Successfully added notes to session with ID: {session_display_id}")
-        return jsonify(session.to_dict()), 200
+        return add_validators(jsonify(session.to_dict()), entity_etag(session)), 200
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error adding notes to session with ID {session_display_id}: {e}")
         return jsonify({"error": str(e)}), 500
+
+def _drop_appended_notes(rows):
+    # Bulk notes replace the whole text like PUT does, so earlier appends go with it
+    ids = [row['id'] for row in rows if 'notes' in row]
+    if ids:
+        unindex_notes(db.session.connection(), ids)
+        db.session.execute(delete(SessionNote).where(SessionNote.session_id.in_(ids)))
+
+@session_bp.route('/sessions/bulk', methods=['POST'])
+def bulk_upsert_sessions():
+    logger.info("Request received to bulk create/update sessions.")
+    try:
+        try:
+            items = parse_bulk_items(request)
+        except ValueError as e:
+            logger.warning(f"Invalid bulk session payload: {e}")
+            return jsonify({"error": str(e)}), 400
+        
+        results = [None] * len(items)
+        fields = {'sessionNumber': 'session_number', 'completed': 'completed', 'notes': 'notes', 'category': 'category', 'zoomLink': 'zoom_link'}
+        
+        # Resolve every referenced session and client with one IN query each
+        objects = [item for item in items if isinstance(item, dict)]
+        existing = lookup_ids(Session, [item.get('id') for item in objects])
+        clients = lookup_ids(Client, [item.get('clientId') for item in objects])
+        
+        now = datetime.utcnow()
+        creates, updates = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = error_result(index, 400, "Each item must be a JSON object")
+                continue
+            
+            if 'id' in item:
+                row = existing.get(item['id'])
+                if row is None:
+                    results[index] = error_result(index, 404, "Session not found")
+                    continue
+                values = {column: item[key] for key, column in fields.items() if key in item}
+            else:
+                if not item.get('clientId') or not item.get('sessionNumber') or not item.get('date'):
+                    results[index] = error_result(index, 400, "Client ID, session number, and date are required fields")
+                    continue
+                values = {
+                    "session_number": item['sessionNumber'],
+                    "category": item.get('category', 'Initial Consultation'),
+                    "completed": item.get('completed', False),
+                    "notes": item.get('notes'),
+                    "zoom_link": item.get('zoomLink'),
+                }
+            
+            if 'clientId' in item:
+                client = clients.get(item['clientId'])
+                if client is None:
+                    results[index] = error_result(index, 404, "Client not found")
+                    continue
+                values['client_id'] = client.id
+            
+            if 'date' in item:
+                try:
+                    values['date'] = datetime.fromisoformat(item['date'].replace('Z', '+00:00'))
+                except (AttributeError, ValueError):
+                    results[index] = error_result(index, 400, "Invalid date format. Use ISO format (e.g., 2023-01-01T12:00:00Z)")
+                    continue
+            
+            values['updated_at'] = now
+            if 'id' in item:
+                values['id'] = row.id
+                updates.append((index, values, row.display_id))
+            else:
+                creates.append((index, values))
+        
+        for (_, row), display_id in zip(creates, next_display_ids('session', len(creates))):
+            row['display_id'] = display_id
+        
+        write_chunks(Session, creates, updates, results, before_update=_drop_appended_notes)
+        summary = summarize(results)
+        logger.info(f"Bulk session request finished: {summary['succeeded']} succeeded, {summary['failed']} failed.")
+        return jsonify(summary), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in bulk session request: {e}")
+        return jsonify({"error": str(e)}), 500
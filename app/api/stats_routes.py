@@ -0,0 +1,30 @@
+import json
+import logging
+from flask import Blueprint, jsonify
+from flask_cors import CORS
+from ..utils.conditional import add_validators, make_etag, not_modified
+from ..utils.stats import dashboard
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+stats_bp = Blueprint('stats_routes', __name__)
+CORS(stats_bp)
+
+@stats_bp.route('/stats', methods=['GET'])
+def get_stats():
+    logger.info("Request received to get dashboard stats.")
+    try:
+        # The summary table holds a handful of rows, so the aggregates are read whole
+        stats = dashboard()
+        etag = make_etag("stats", json.dumps(stats, sort_keys=True))
+        cached = not_modified(etag)
+        if cached:
+            logger.info("Stats not modified since last request.")
+            return cached
+        
+        return add_validators(jsonify(stats), etag), 200
+    except Exception as e:
+        logger.error(f"Error retrieving stats: {e}")
+        return jsonify({"error": str(e)}), 500
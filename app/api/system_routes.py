@@ -0,0 +1,24 @@
+import logging
+from flask import Blueprint, jsonify
+from flask_cors import CORS
+from ..utils.cache import get_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+system_bp = Blueprint('system_routes', __name__)
+CORS(system_bp)
+
+@system_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    logger.info("Request received to get cache statistics.")
+    try:
+        cache = get_cache()
+        return jsonify({
+            "displayIds": cache.ids.stats(),
+            "entities": cache.dicts.stats(),
+        }), 200
+    except Exception as e:
+        logger.error(f"Error retrieving cache statistics: {e}")
+        return jsonify({"error": str(e)}), 500
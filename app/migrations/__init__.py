@@ -0,0 +1,114 @@
+import logging
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from ..models import db
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Registered migrations as (version, name, function) tuples, kept sorted by version
+MIGRATIONS = []
+
+
+def migration(version, name):
+    # Register a function taking a SQLAlchemy connection as a versioned schema change
+    def decorator(func):
+        if any(existing[0] == version for existing in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def execute_script(conn, statements):
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def add_column(conn, table, column, ddl):
+    # ALTER TABLE ... ADD COLUMN that tolerates databases created by db.create_all()
+    existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _ensure_migrations_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "name TEXT NOT NULL, "
+            "applied_at DATETIME NOT NULL)"
+        ))
+
+
+def applied_migrations(engine):
+    _ensure_migrations_table(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT version, name, applied_at FROM schema_migrations ORDER BY version"
+        )).all()
+    return [{"version": row[0], "name": row[1], "appliedAt": str(row[2])} for row in rows]
+
+
+def pending_migrations(engine):
+    applied = {m["version"] for m in applied_migrations(engine)}
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def upgrade(engine):
+    """Apply every pending migration, each in its own transaction. Returns the applied versions."""
+    applied = []
+    for version, name, func in pending_migrations(engine):
+        try:
+            with engine.begin() as conn:
+                # Claiming the version row first takes the write lock, so concurrent
+                # workers starting up together can't apply the same migration twice
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                    {"version": version, "name": name, "applied_at": datetime.utcnow()},
+                )
+                func(conn)
+        except IntegrityError:
+            logger.info(f"Migration {version} ({name}) was applied by another process.")
+            continue
+        logger.info(f"Applied migration {version}: {name}")
+        applied.append(version)
+    return applied
+
+
+@click.group('migrations')
+def migrations_cli():
+    """Manage versioned schema migrations."""
+
+
+@migrations_cli.command('upgrade')
+@with_appcontext
+def upgrade_command():
+    """Apply all pending migrations."""
+    engine = db.engine
+    applied = upgrade(engine)
+    if applied:
+        click.echo(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        click.echo("Database is up to date.")
+
+
+@migrations_cli.command('status')
+@with_appcontext
+def status_command():
+    """List applied and pending migrations."""
+    engine = db.engine
+    for m in applied_migrations(engine):
+        click.echo(f"[applied]  {m['version']:>4}  {m['name']}  ({m['appliedAt']})")
+    for version, name, _ in pending_migrations(engine):
+        click.echo(f"[pending]  {version:>4}  {name}")
+
+
+# Import the versions module so its migrations register themselves
+from . import versions  # noqa: E402,F401
@@ -0,0 +1,250 @@
+from sqlalchemy import select, text
+from . import add_column, execute_script, migration
+
+
+@migration(1, "initial schema")
+def initial_schema(conn):
+    # Mirrors mydatabase.sql so an empty database can be brought up by the runner alone
+    execute_script(conn, [
+        """CREATE TABLE IF NOT EXISTS clients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            display_id TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            phone TEXT,
+            source TEXT,
+            status TEXT NOT NULL,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            display_id TEXT UNIQUE NOT NULL,
+            client_id INTEGER NOT NULL,
+            session_number INTEGER NOT NULL,
+            date DATETIME NOT NULL,
+            category TEXT DEFAULT 'Initial Consultation',
+            completed BOOLEAN DEFAULT 0,
+            notes TEXT,
+            zoom_link TEXT,
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            display_id TEXT UNIQUE NOT NULL,
+            client_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            sent BOOLEAN DEFAULT 0,
+            sent_date DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )""",
+    ])
+
+
+@migration(2, "indexes for client, status, date and sent lookups")
+def lookup_indexes(conn):
+    execute_script(conn, [
+        # Per-client listings; the date column also serves date-ordered per-client reads
+        "CREATE INDEX IF NOT EXISTS ix_sessions_client_id_date ON sessions (client_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_date ON sessions (date)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_client_id ON documents (client_id)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_sent ON documents (sent)",
+        "CREATE INDEX IF NOT EXISTS ix_clients_status ON clients (status)",
+    ])
+
+
+@migration(3, "display_id sequences")
+def display_id_sequences(conn):
+    execute_script(conn, [
+        # The old triggers rewrote display_id with three-digit padding after every insert
+        "DROP TRIGGER IF EXISTS generate_client_display_id",
+        "DROP TRIGGER IF EXISTS generate_session_display_id",
+        "DROP TRIGGER IF EXISTS generate_document_display_id",
+        """CREATE TABLE IF NOT EXISTS id_sequences (
+            entity TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        )""",
+    ])
+    # Start each sequence past both the highest row id and the highest existing display number
+    for entity, table, prefix in [
+        ('client', 'clients', 'CLIENT-'),
+        ('session', 'sessions', 'SESSION-'),
+        ('document', 'documents', 'DOCUMENT-'),
+    ]:
+        execute_script(conn, [
+            f"""INSERT INTO id_sequences (entity, next_value)
+            SELECT '{entity}', MAX(
+                COALESCE(MAX(id), 0),
+                COALESCE(MAX(CAST(substr(display_id, {len(prefix) + 1}) AS INTEGER)), 0)
+            ) FROM {table}""",
+        ])
+
+
+@migration(4, "session timestamps and updated_at indexes")
+def updated_at_indexes(conn):
+    add_column(conn, "sessions", "updated_at", "DATETIME")
+    execute_script(conn, [
+        # Collection ETags are built from max(updated_at), which these turn into index lookups
+        "CREATE INDEX IF NOT EXISTS ix_clients_updated_at ON clients (updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_updated_at ON sessions (updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_updated_at ON documents (updated_at)",
+    ])
+
+
+@migration(5, "document content length and hash")
+def document_fingerprints(conn):
+    from ..models.document import Document
+
+    add_column(conn, "documents", "content_length", "INTEGER")
+    add_column(conn, "documents", "content_hash", "VARCHAR(64)")
+    # Backfill in batches so large bodies aren't all held in memory at once
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, content FROM documents WHERE id > :last_id ORDER BY id LIMIT 500"),
+            {"last_id": last_id},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE documents SET content_length = :length, content_hash = :hash WHERE id = :id"),
+            [dict(zip(("length", "hash"), Document.fingerprint(row.content or "")), id=row.id) for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+@migration(6, "compress large document bodies")
+def compress_documents(conn):
+    from ..models.document import Document
+
+    content_type = Document.__table__.c.content.type
+    last_id = 0
+    while True:
+        # Only plain-text bodies at or above the threshold; compressed rows are already BLOBs
+        rows = conn.execute(
+            text(
+                "SELECT id, content FROM documents WHERE id > :last_id AND typeof(content) = 'text' "
+                "AND length(CAST(content AS BLOB)) >= :threshold ORDER BY id LIMIT 200"
+            ),
+            {"last_id": last_id, "threshold": content_type.threshold},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE documents SET content = :content WHERE id = :id"),
+            [{"content": content_type.compress(row.content), "id": row.id} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+@migration(7, "full-text search index")
+def search_index(conn):
+    from ..models.document import Document
+    from ..utils.search import SEARCH_TABLE, write_entries
+
+    execute_script(conn, [
+        # body is the searchable text; scope carries "client<id> <kind>" so the client and type
+        # filters are index lookups. The rest are stored for the result and never tokenized.
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            body, scope, kind UNINDEXED, ref_id UNINDEXED, client_id UNINDEXED,
+            tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3'
+        )""",
+        # Rank on body alone. The rowids below follow search_rowid(): id * 4 + the table's tag
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+        f"""INSERT INTO {SEARCH_TABLE} (rowid, body, scope, kind, ref_id, client_id)
+            SELECT id * 4 + 1, notes, 'client' || id || ' client', 'client', id, id
+            FROM clients WHERE notes IS NOT NULL AND notes != ''""",
+        f"""INSERT INTO {SEARCH_TABLE} (rowid, body, scope, kind, ref_id, client_id)
+            SELECT id * 4 + 2, notes, 'client' || client_id || ' session', 'session', id, client_id
+            FROM sessions WHERE notes IS NOT NULL AND notes != ''""",
+    ])
+
+    # Document bodies may be stored compressed, so they are read back through the column type
+    table = Document.__table__
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.client_id, table.c.content)
+            .where(table.c.id > last_id).order_by(table.c.id).limit(200)
+        ).all()
+        if not rows:
+            break
+        write_entries(conn, Document, [(row.id, row.client_id, row.content) for row in rows])
+        last_id = rows[-1].id
+
+
+@migration(8, "list filter and sort indexes")
+def list_filter_indexes(conn):
+    execute_script(conn, [
+        # Every field the list endpoints filter or sort on is served from an index
+        "CREATE INDEX IF NOT EXISTS ix_clients_name ON clients (name)",
+        "CREATE INDEX IF NOT EXISTS ix_clients_source ON clients (source)",
+        "CREATE INDEX IF NOT EXISTS ix_clients_created_at ON clients (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_category ON sessions (category)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_completed_date ON sessions (completed, date)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_type ON documents (type)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_sent_date ON documents (sent_date)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_created_at ON documents (created_at)",
+    ])
+
+
+@migration(9, "dashboard summary table")
+def dashboard_stats(conn):
+    from ..utils.stats import STATS_TABLE, rebuild, trigger_statements
+
+    execute_script(conn, [
+        f"""CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+            metric TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, key)
+        ) WITHOUT ROWID""",
+        *trigger_statements(),
+    ])
+    # Count the rows that existed before the triggers
+    rebuild(conn)
+
+
+@migration(10, "append-only session notes")
+def session_notes(conn):
+    # Existing notes stay in sessions.notes; appends from now on are rows here
+    execute_script(conn, [
+        """CREATE TABLE IF NOT EXISTS session_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+            body TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_session_notes_session_id ON session_notes (session_id)",
+    ])
+
+
+@migration(11, "row versions")
+def row_versions(conn):
+    # Optimistic concurrency: updates are conditioned on, and bump, the row's version
+    for table in ('clients', 'sessions', 'documents'):
+        add_column(conn, table, 'version', 'INTEGER NOT NULL DEFAULT 1')
+
+
+@migration(12, "backfill session updated_at")
+def backfill_session_updated_at(conn):
+    # Sessions from before migration 4 have no updated_at, which leaves them out of max(updated_at)
+    # and of updatedAt filters. Use the session date, capped at now: a future value would hide
+    # later edits from the collection ETag. The format matches what SQLAlchemy writes
+    conn.execute(text(
+        "UPDATE sessions SET updated_at = MIN(date, strftime('%Y-%m-%d %H:%M:%S.000000', 'now')) "
+        "WHERE updated_at IS NULL"
+    ))
+
+
+@migration(13, "dashboard counts open sessions, not upcoming ones")
+def open_session_counter(conn):
+    from ..utils.stats import drop_trigger_statements, rebuild, trigger_statements
+
+    # The sessions bucket is renamed, so its triggers are recreated with the new CASE and recounted
+    execute_script(conn, [*drop_trigger_statements(), *trigger_statements()])
+    rebuild(conn)
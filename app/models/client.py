@@ -5,15 +5,19 @@ class Client(db.Model):
     __tablename__ = 'clients'
 
     id = db.Column(db.Integer, primary_key=True)
-    display_id = db.Column(db.String(10), unique=True)
-    name = db.Column(db.String(255), nullable=False)
+    display_id = db.Column(db.String(20), unique=True)
+    name = db.Column(db.String(255), nullable=False, index=True)
     email = db.Column(db.String(255), unique=True, nullable=False)
     phone = db.Column(db.String(20))
-    source = db.Column(db.String(255))
-    status = db.Column(db.String(255), nullable=False)
+    source = db.Column(db.String(255), index=True)
+    status = db.Column(db.String(255), nullable=False, index=True)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Bumped by every UPDATE, which only applies while the row still has the version it was read at
+    version = db.Column(db.Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     sessions = db.relationship('Session', backref='client', lazy=True, cascade='all, delete-orphan')
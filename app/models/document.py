@@ -1,19 +1,30 @@
 
+import hashlib
 from . import db
+from .client import Client
+from .types import CompressedText
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 class Document(db.Model):
     __tablename__ = 'documents'
 
     id = db.Column(db.Integer, primary_key=True)
-    display_id = db.Column(db.String(13), unique=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
-    type = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    sent = db.Column(db.Boolean, default=False)
-    sent_date = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    display_id = db.Column(db.String(20), unique=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False, index=True)
+    type = db.Column(db.String(255), nullable=False, index=True)
+    # Bodies can run to hundreds of KB, so they are stored gzip-compressed above 4 KB
+    # and only loaded (and decompressed) when accessed or undeferred
+    content = db.deferred(db.Column(CompressedText(threshold=4096), nullable=False))
+    content_length = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64))
+    sent = db.Column(db.Boolean, default=False, index=True)
+    sent_date = db.Column(db.DateTime, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __init__(self, client_id, type, content, sent=False, sent_date=None):
         self.client_id = client_id
@@ -22,14 +33,40 @@ class Document(db.Model):
         self.sent = sent
         self.sent_date = sent_date
 
-    def to_dict(self):
-        return {
+    @staticmethod
+    def fingerprint(content):
+        # UTF-8 byte length and SHA-256 of the body, stored so list views never read it
+        encoded = content.encode("utf-8")
+        return len(encoded), hashlib.sha256(encoded).hexdigest()
+
+    @db.validates('content')
+    def _update_fingerprint(self, key, content):
+        if content is not None:
+            self.content_length, self.content_hash = Document.fingerprint(content)
+        return content
+
+    @classmethod
+    def with_client(cls):
+        # Load the parent client's display_id in the same query so to_dict() doesn't
+        # issue a lazy SELECT per row
+        return cls.query.options(joinedload(cls.client).load_only(Client.display_id))
+
+    def to_dict(self, include_content=True):
+        data = {
             "id": self.display_id,  # Return display_id as the public ID
             "clientId": self.client.display_id,  # Return client's display_id
             "type": self.type,
-            "content": self.content,
             "sent": self.sent,
             "sentDate": self.sent_date.isoformat() if self.sent_date else None,
             "createdAt": self.created_at.isoformat() if self.created_at else None,
             "updatedAt": self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_content:
+            data["content"] = self.content
+        return data
+
+    def to_summary_dict(self):
+        data = self.to_dict(include_content=False)
+        data["contentLength"] = self.content_length
+        data["contentHash"] = self.content_hash
+        return data
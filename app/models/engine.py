@@ -0,0 +1,81 @@
+import logging
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+READ_BIND = 'read'
+ALLOCATOR_BIND = 'allocator'
+
+
+class RoutingSession(Session):
+    # Sends queries issued while handling a read-only request to the read pool.
+    # Flushes always go to the default (writer) engine.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and g.get('use_read_bind')
+            and READ_BIND in self._db.engines
+        ):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def _set_pragmas(engine, pragmas, query_only=False):
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+def configure_engines(app):
+    """Set engine options and binds for the SQLite profile. Call before db.init_app."""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if not _is_sqlite_file(uri):
+        return
+
+    # A single pooled writer connection: SQLite only allows one writer at a time anyway,
+    # so queue writers in the pool instead of spinning on SQLITE_BUSY
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', 1)
+    options.setdefault('max_overflow', 0)
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    read_pool_size = app.config.get('SQLITE_READ_POOL_SIZE', 4)
+    if read_pool_size and READ_BIND not in binds:
+        binds[READ_BIND] = {"url": uri, "pool_size": read_pool_size, "max_overflow": 0}
+    # display_id block reservations commit independently of the request's own transaction
+    if ALLOCATOR_BIND not in binds:
+        binds[ALLOCATOR_BIND] = {"url": uri, "pool_size": 1, "max_overflow": 0}
+
+
+def init_app(app, db):
+    """Apply pragmas and read routing once db.init_app has created the engines."""
+    if not _is_sqlite_file(app.config.get('SQLALCHEMY_DATABASE_URI', '')):
+        return
+
+    pragmas = app.config['SQLITE_PRAGMAS']
+    with app.app_context():
+        engines = db.engines
+        for key, engine in engines.items():
+            _set_pragmas(engine, pragmas, query_only=(key == READ_BIND))
+
+    if READ_BIND in engines:
+        @app.before_request
+        def route_reads():
+            g.use_read_bind = request.method in ('GET', 'HEAD')
+
+    logger.info(f"SQLite engine profile applied to binds: {sorted(str(k) for k in engines)}")
@@ -1,19 +1,35 @@
 
 from . import db
+from .client import Client
+from .session_note import SessionNote
 from datetime import datetime
+from sqlalchemy import func, select, type_coerce
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import joinedload
 
 class Session(db.Model):
     __tablename__ = 'sessions'
+    __table_args__ = (
+        db.Index('ix_sessions_client_id_date', 'client_id', 'date'),
+        db.Index('ix_sessions_completed_date', 'completed', 'date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    display_id = db.Column(db.String(12), unique=True)
+    display_id = db.Column(db.String(20), unique=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
     session_number = db.Column(db.Integer, nullable=False)
-    date = db.Column(db.DateTime, nullable=False)
-    category = db.Column(db.String(50), default='Initial Consultation')
+    date = db.Column(db.DateTime, nullable=False, index=True)
+    category = db.Column(db.String(50), default='Initial Consultation', index=True)
     completed = db.Column(db.Boolean, default=False)
     notes = db.Column(db.Text)
     zoom_link = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
+
+    # `notes` holds the text set on create/update; later appends are rows of their own
+    appended_notes = db.relationship('SessionNote', order_by=SessionNote.id, lazy=True, cascade='all, delete-orphan')
 
     def __init__(self, client_id, session_number, date, category='Initial Consultation', completed=False, notes=None, zoom_link=None):
         self.client_id = client_id
@@ -23,6 +39,37 @@ class Session(db.Model):
         self.completed = completed
         self.notes = notes
         self.zoom_link = zoom_link
+        # Nothing has been appended yet, so to_dict() needn't query for it
+        self.appended_notes = []
+
+    @hybrid_property
+    def notes_text(self):
+        """The full notes: the stored text followed by each appended note on its own line."""
+        appended = [note.body for note in self.appended_notes]
+        if not appended:
+            return self.notes
+        return (f"{self.notes}\n" if self.notes else "") + "\n".join(appended)
+
+    @notes_text.expression
+    def notes_text(cls):
+        # group_concat has no ORDER BY of its own on this SQLite, so it aggregates an
+        # id-ordered subquery, matching the Python side's appended_notes order
+        ordered = (
+            select(SessionNote.body)
+            .where(SessionNote.session_id == cls.id)
+            .order_by(SessionNote.id)
+            .correlate(cls)
+            .subquery()
+        )
+        appended = select(func.group_concat(ordered.c.body, '\n')).scalar_subquery()
+        prefix = func.coalesce(func.nullif(cls.notes, '', type_=db.Text).concat('\n'), '')
+        return type_coerce(func.coalesce(prefix.concat(appended), cls.notes), db.Text)
+
+    @classmethod
+    def with_client(cls):
+        # Load the parent client's display_id in the same query so to_dict() doesn't
+        # issue a lazy SELECT per row
+        return cls.query.options(joinedload(cls.client).load_only(Client.display_id))
 
     def to_dict(self):
         return {
@@ -32,6 +79,6 @@ class Session(db.Model):
             "date": self.date.isoformat() if self.date else None,
             "category": self.category,
             "completed": self.completed,
-            "notes": self.notes,
+            "notes": self.notes_text,
             "zoomLink": self.zoom_link
         }
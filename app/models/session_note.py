@@ -0,0 +1,15 @@
+from . import db
+from datetime import datetime
+
+class SessionNote(db.Model):
+    """A note appended to a session. Rows are only ever inserted, or removed when the notes are replaced."""
+    __tablename__ = 'session_notes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('sessions.id', ondelete='CASCADE'), nullable=False, index=True)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __init__(self, session_id, body):
+        self.session_id = session_id
+        self.body = body
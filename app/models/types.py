@@ -0,0 +1,40 @@
+import gzip
+from sqlalchemy.types import Text, TypeDecorator
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as gzip bytes once its UTF-8 encoding reaches `threshold` bytes.
+
+    Shorter values stay plain TEXT, and rows written before compression was enabled
+    keep reading back unchanged. gzip (rather than raw zlib) is used so a stored body
+    can be sent as-is to clients that accept `Content-Encoding: gzip`.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, threshold=4096, level=6, **kwargs):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+        self.level = level
+
+    def compress(self, value):
+        encoded = value.encode("utf-8")
+        if len(encoded) < self.threshold:
+            return value
+        # mtime=0 keeps the output deterministic for identical bodies
+        return gzip.compress(encoded, compresslevel=self.level, mtime=0)
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        return self.compress(value)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            if value.startswith(GZIP_MAGIC):
+                value = gzip.decompress(value)
+            return value.decode("utf-8")
+        return value
@@ -0,0 +1,142 @@
+import json
+import logging
+from collections import defaultdict
+from sqlalchemy import bindparam, insert, update
+from ..models import db
+from .cache import invalidate, invalidate_collection
+from .search import index_bulk
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 1000
+MAX_BULK_ITEMS = 100000
+# Stay well below SQLite's bound-parameter limit in IN lists
+IN_CLAUSE_CHUNK = 10000
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+def parse_bulk_items(req):
+    """Read the request body as a JSON array or an NDJSON stream of objects."""
+    if req.mimetype in NDJSON_MIMETYPES:
+        items = []
+        for number, line in enumerate(req.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f"Invalid JSON on line {number}")
+            if len(items) > MAX_BULK_ITEMS:
+                raise ValueError(f"At most {MAX_BULK_ITEMS} items are accepted per request")
+    else:
+        items = req.get_json(silent=True)
+        if not isinstance(items, list):
+            raise ValueError("Request body must be a JSON array or NDJSON")
+        if len(items) > MAX_BULK_ITEMS:
+            raise ValueError(f"At most {MAX_BULK_ITEMS} items are accepted per request")
+    return items
+
+
+def chunked(seq, size):
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+
+def lookup_ids(model, display_ids, *columns):
+    """Map display_ids to rows of (display_id, id, *columns) with one IN query per 10k ids."""
+    found = {}
+    unique = list({d for d in display_ids if isinstance(d, str)})
+    for chunk in chunked(unique, IN_CLAUSE_CHUNK):
+        rows = db.session.query(model.display_id, model.id, *columns).filter(model.display_id.in_(chunk)).all()
+        for row in rows:
+            found[row[0]] = row
+    return found
+
+
+def existing_values(column, values):
+    """Return the subset of values already present in column."""
+    found = set()
+    for chunk in chunked(list(set(values)), IN_CLAUSE_CHUNK):
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def error_result(index, status, message):
+    return {"index": index, "status": status, "error": message}
+
+
+def update_rows(model, rows):
+    """UPDATE rows by primary key with one executemany per set of columns, bumping the row version.
+
+    The ORM's bulk UPDATE would check each row's version and fall back to one
+    statement per row; these updates are last-write-wins, so the version is
+    simply incremented in the same statement.
+    """
+    table = model.__table__
+    groups = defaultdict(list)
+    for row in rows:
+        params = {key: value for key, value in row.items() if key != 'id'}
+        params['_id'] = row['id']
+        groups[tuple(sorted(params))].append(params)
+    for group in groups.values():
+        statement = update(table).where(table.c.id == bindparam('_id'))
+        if model.__mapper__.version_id_col is not None:
+            statement = statement.values(version=table.c.version + 1)
+        db.session.execute(statement, group)
+
+
+def write_chunks(model, inserts, updates, results, before_update=None):
+    """Insert and update rows with executemany, committing one chunk per transaction.
+
+    `inserts` holds (index, row) pairs and `updates` holds (index, row, display_id)
+    triples, where row is a column dict and update rows carry the primary key as
+    `id`. `before_update`, if given, is called with each chunk's update rows in the
+    chunk's transaction. Per-item outcomes are written into `results` by index.
+    """
+    table = model.__tablename__
+    for chunk in chunked(inserts, BULK_CHUNK_SIZE):
+        try:
+            rows = [row for _, row in chunk]
+            db.session.execute(insert(model), rows)
+            # Executemany bypasses the mapper events, so keep the search index in step here
+            index_bulk(model, inserts=rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Bulk insert into {table} failed for a chunk of {len(chunk)}: {e}")
+            for index, _ in chunk:
+                results[index] = error_result(index, 500, str(e))
+            continue
+        invalidate_collection(table)
+        for index, row in chunk:
+            results[index] = {"index": index, "status": 201, "id": row["display_id"]}
+
+    for chunk in chunked(updates, BULK_CHUNK_SIZE):
+        try:
+            rows = [row for _, row, _ in chunk]
+            if before_update is not None:
+                before_update(rows)
+            update_rows(model, rows)
+            index_bulk(model, updates=rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Bulk update of {table} failed for a chunk of {len(chunk)}: {e}")
+            for index, _, _ in chunk:
+                results[index] = error_result(index, 500, str(e))
+            continue
+        for index, _, display_id in chunk:
+            # Executemany bypasses the mapper events, so drop cached copies here
+            invalidate(table, display_id)
+            results[index] = {"index": index, "status": 200, "id": display_id}
+
+
+def summarize(results):
+    succeeded = sum(1 for r in results if r["status"] in (200, 201))
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+    }
@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from ..models import db
+from ..models.client import Client
+from ..models.document import Document
+from ..models.session import Session
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+# Tables whose rows appear in the calendar feeds
+FEED_TABLES = ('clients', 'sessions')
+
+
+class LRUCache:
+    """Bounded LRU cache with per-entry TTL and hit/miss counters.
+
+    `generation` increases on every invalidation. Readers capture it before going to
+    the database and pass it to `set`, which drops the value if anything was
+    invalidated in between, so a slow reader can't store a row that was just changed.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxSize": self.maxsize,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class EntityCache:
+    # display_id -> primary key, and display_id -> (etag, serialized dict), per table;
+    # feeds maps a calendar feed to (write marker, ETag) and is dropped on any session or client write
+    def __init__(self, maxsize, ttl):
+        self.ids = LRUCache(maxsize, ttl)
+        self.dicts = LRUCache(maxsize, ttl)
+        self.feeds = LRUCache(maxsize, ttl)
+
+    def invalidate(self, table, display_id):
+        key = (table, display_id)
+        self.ids.invalidate(key)
+        self.dicts.invalidate(key)
+        self.invalidate_collection(table)
+
+    def invalidate_collection(self, table):
+        if table in FEED_TABLES:
+            self.feeds.clear()
+
+
+def init_app(app):
+    app.extensions['entity_cache'] = EntityCache(
+        maxsize=app.config.get('ENTITY_CACHE_SIZE', 10000),
+        ttl=app.config.get('ENTITY_CACHE_TTL', 300),
+    )
+
+
+def get_cache():
+    return current_app.extensions['entity_cache']
+
+
+def resolve_id(model, display_id, fresh=False):
+    """Map a display_id to the row's primary key, or None if it doesn't exist.
+
+    The cache is per process and doesn't see deletes made by other workers, so write
+    paths pass `fresh=True` to check the row still exists before pointing a foreign key at it.
+    """
+    cache = get_cache().ids
+    key = (model.__tablename__, display_id)
+    pk = MISSING if fresh else cache.get(key)
+    if pk is not MISSING:
+        return pk
+
+    generation = cache.generation
+    pk = db.session.query(model.id).filter(model.display_id == display_id).scalar()
+    if pk is not None:
+        cache.set(key, pk, generation)
+    return pk
+
+
+def cached_dict(model, display_id, etag, load, content=None):
+    """Return the serialized row for display_id, reusing the cached copy while its ETag matches.
+
+    `content`, when given, fetches the row's body. The body is then left out of the cached
+    copy and read on every request, so the cache only holds small metadata dicts.
+    """
+    cache = get_cache().dicts
+    key = (model.__tablename__, display_id)
+    entry = cache.get(key)
+    if entry is not MISSING and entry[0] == etag:
+        if content is None:
+            return entry[1]
+        body = content()
+        return None if body is None else {**entry[1], "content": body}
+
+    generation = cache.generation
+    obj = load()
+    if obj is None:
+        return None
+    if content is None:
+        data = obj.to_dict()
+        cache.set(key, (etag, data), generation)
+        return data
+    data = obj.to_dict(include_content=False)
+    cache.set(key, (etag, data), generation)
+    return {**data, "content": obj.content}
+
+
+def cached_feed_etag(key, marker, compute):
+    """Return the feed's ETag, reusing the cached one while the database's write marker is unchanged.
+
+    Invalidation only reaches this process, so the marker is what catches writes made
+    through other workers.
+    """
+    cache = get_cache().feeds
+    entry = cache.get(key)
+    if entry is not MISSING and entry[0] == marker:
+        return entry[1]
+
+    generation = cache.generation
+    etag = compute()
+    cache.set(key, (marker, etag), generation)
+    return etag
+
+
+def invalidate(table, display_id):
+    if has_app_context() and 'entity_cache' in current_app.extensions:
+        get_cache().invalidate(table, display_id)
+
+
+def invalidate_collection(table):
+    # For writes that add rows without touching any cached entity, such as bulk inserts
+    if has_app_context() and 'entity_cache' in current_app.extensions:
+        get_cache().invalidate_collection(table)
+
+
+def _on_change(mapper, connection, target):
+    invalidate(target.__tablename__, target.display_id)
+    # Remember the key so it is dropped again once the transaction commits
+    session = OrmSession.object_session(target)
+    if session is not None:
+        session.info.setdefault('cache_invalidations', set()).add((target.__tablename__, target.display_id))
+
+
+def _after_commit(session):
+    for table, display_id in session.info.pop('cache_invalidations', ()):
+        invalidate(table, display_id)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop('cache_invalidations', None)
+
+
+for _model in (Client, Session, Document):
+    for _name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _name, _on_change)
+
+event.listen(OrmSession, 'after_commit', _after_commit)
+event.listen(OrmSession, 'after_soft_rollback', _after_rollback)
@@ -0,0 +1,110 @@
+import logging
+import zlib
+from flask import current_app, request
+from werkzeug.wsgi import ClosingIterator
+from .cache import MISSING, LRUCache
+from .conditional import encoded_etag
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/plain',
+    'text/calendar',
+    'text/csv',
+}
+
+# zlib window bits for each content coding; HTTP "deflate" is the zlib format
+WBITS = {'gzip': 31, 'deflate': 15}
+
+
+def _compressor(encoding, level):
+    return zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+
+
+def _compress(data, encoding, level):
+    compressor = _compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _stream(source, encoding, level, cache, key, max_cached):
+    # Compress chunks as they are produced without flushing per chunk, so small
+    # fragments still share one deflate stream; zlib emits output as its buffer fills
+    compressor = _compressor(encoding, level)
+    parts = [] if key is not None else None
+    size = 0
+    for chunk in source:
+        data = compressor.compress(chunk)
+        if data:
+            if parts is not None:
+                parts.append(data)
+                size += len(data)
+                if size > max_cached:
+                    parts = None
+            yield data
+    data = compressor.flush()
+    if parts is not None:
+        cache.set(key, b"".join(parts) + data)
+    yield data
+
+
+def compress_response(response):
+    config = current_app.config
+    if (
+        request.method == 'HEAD'
+        or response.status_code != 200
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or 'Content-Encoding' in response.headers
+        or response.direct_passthrough
+    ):
+        return response
+
+    encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    level = config.get('COMPRESS_LEVEL', 6)
+    cache = current_app.extensions['compression_cache']
+    etag, weak = response.get_etag()
+    # Bodies are only reused when the identity body is pinned down by a strong ETag
+    key = (request.path, etag, encoding, level) if etag and not weak else None
+
+    cached = cache.get(key) if key is not None else MISSING
+
+    if response.is_streamed:
+        if cached is not MISSING:
+            # The view's generator hasn't run yet; drop it and replay the stored body
+            if hasattr(response.response, 'close'):
+                response.response.close()
+            response.set_data(cached)
+        else:
+            # The view's body is closed along with the compressed one, even if that is never read
+            original = response.response
+            response.response = ClosingIterator(
+                _stream(response.iter_encoded(), encoding, level, cache, key, config.get('COMPRESS_CACHE_MAX_BODY', 1024 * 1024)),
+                getattr(original, 'close', None),
+            )
+            response.headers.pop('Content-Length', None)
+    else:
+        if response.content_length is not None and response.content_length < config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+        if cached is MISSING:
+            cached = _compress(response.get_data(), encoding, level)
+            if key is not None and len(cached) <= config.get('COMPRESS_CACHE_MAX_BODY', 1024 * 1024):
+                cache.set(key, cached)
+        response.set_data(cached)
+
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak=weak)
+    return response
+
+
+def init_app(app):
+    app.extensions['compression_cache'] = LRUCache(
+        maxsize=app.config.get('COMPRESS_CACHE_SIZE', 256),
+        ttl=app.config.get('COMPRESS_CACHE_TTL', 600),
+    )
+    app.after_request(compress_response)
@@ -0,0 +1,149 @@
+import hashlib
+from flask import Response, jsonify, request
+from sqlalchemy import func, inspect, select, text
+from ..models import db
+from ..models.session import Session
+from ..models.session_note import SessionNote
+from .stats import STATS_TABLE
+
+# Rows appended to a parent without writing the parent row, but shown in its representation:
+# parent model -> (child model, foreign key, relationship). The latest child id is part of the
+# parent's validators, so appends change its ETag and Last-Modified
+APPENDED = {Session: (SessionNote, SessionNote.session_id, 'appended_notes')}
+
+
+def make_etag(*parts):
+    # Strong validator: any change to the parts yields a different tag
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def encoded_etag(etag, encoding):
+    # A content-coded body is a different representation and needs its own strong tag
+    return f"{etag}-{encoding}"
+
+
+def _matches(etags, etag):
+    return any(
+        etags.contains(tag)
+        for tag in (etag, encoded_etag(etag, "gzip"), encoded_etag(etag, "deflate"))
+    )
+
+
+def version_etag(table, display_id, pk, version, latest_child=None):
+    # The row version changes with every write, so it identifies the representation
+    if latest_child is None:
+        return make_etag(table, display_id, pk, version)
+    return make_etag(table, display_id, pk, version, latest_child)
+
+
+def _latest_child(obj):
+    if type(obj) not in APPENDED:
+        return None
+    child, key, relationship = APPENDED[type(obj)]
+    # to_dict() has usually loaded the children already
+    if relationship not in inspect(obj).unloaded:
+        return max((c.id for c in getattr(obj, relationship)), default=None)
+    return db.session.query(func.max(child.id)).filter(key == obj.id).scalar()
+
+
+def entity_etag(obj):
+    """The ETag of a loaded row; the same tag resource_validators() gives for it."""
+    return version_etag(obj.__tablename__, obj.display_id, obj.id, obj.version, _latest_child(obj))
+
+
+def resource_validators(model, display_id):
+    """Return (etag, last_modified) for one row without loading the ORM object, or None if missing."""
+    columns = [model.id, model.version, model.updated_at]
+    if model in APPENDED:
+        child, key, _ = APPENDED[model]
+        # The latest child by id is also the latest appended, so both come from one index lookup
+        latest = select(child.id).where(key == model.id).order_by(child.id.desc()).limit(1)
+        columns += [latest.scalar_subquery(), latest.with_only_columns(child.created_at).scalar_subquery()]
+    row = db.session.query(*columns).filter(model.display_id == display_id).first()
+    if row is None:
+        return None
+    pk, version, last_modified, *latest = row
+    latest_child, appended_at = latest or (None, None)
+    if appended_at is not None and (last_modified is None or appended_at > last_modified):
+        last_modified = appended_at
+    return version_etag(model.__tablename__, display_id, pk, version, latest_child), last_modified
+
+
+def precondition_failed(obj):
+    """Return a 412 response when If-Match names another version of obj, otherwise None.
+
+    The UPDATE the mapper issues is conditioned on the version obj was loaded at,
+    so a write that commits between this check and the flush still fails (as a
+    StaleDataError) rather than being overwritten.
+    """
+    if not request.if_match or _matches(request.if_match, entity_etag(obj)):
+        return None
+    response = jsonify({"error": "The resource has changed since it was read"})
+    response.status_code = 412
+    response.set_etag(entity_etag(obj))
+    return response
+
+
+def conflict(name):
+    """The response for a write that lost a race with another one (StaleDataError)."""
+    # With If-Match the client asked for exactly this check; without it the write just lost a race
+    status = 412 if request.if_match else 409
+    return jsonify({"error": f"{name} was modified by another request"}), status
+
+
+def collection_etag(model, *criteria):
+    # Row count catches deletes, max(id) catches inserts and max(updated_at) catches updates.
+    # All three are answered from indexes, so no row is loaded.
+    count, max_id, max_updated = db.session.query(
+        db.func.count(model.id), db.func.max(model.id), db.func.max(model.updated_at)
+    ).filter(*criteria).one()
+    if model not in APPENDED:
+        return make_etag(model.__tablename__, request.full_path, count, max_id, max_updated)
+    # Appended children catch appends, which leave the parent rows alone
+    child, key, _ = APPENDED[model]
+    latest = db.session.query(db.func.max(child.id))
+    if criteria:
+        latest = latest.filter(key.in_(db.session.query(model.id).filter(*criteria)))
+    return make_etag(model.__tablename__, request.full_path, count, max_id, max_updated, latest.scalar())
+
+
+def write_marker(*models):
+    """A cheap summary of the models' tables that changes with every insert, update and delete.
+
+    max(updated_at) is an index lookup that moves with inserts and updates, and the
+    dashboard counters hold each table's row count, which moves with inserts and deletes.
+    Being read from the database, it sees writes made through any worker.
+    """
+    columns = []
+    for model in models:
+        table = model.__tablename__
+        columns.append(f"(SELECT max(updated_at) FROM {table})")
+        columns.append(f"(SELECT sum(value) FROM {STATS_TABLE} WHERE metric = '{table}')")
+        if model in APPENDED:
+            columns.append(f"(SELECT max(id) FROM {APPENDED[model][0].__tablename__})")
+    return tuple(db.session.execute(text(f"SELECT {', '.join(columns)}")).one())
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response when the request's validators still match, otherwise None."""
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.1.3)
+        # The client may hold the identity body or a compressed variant of it
+        if _matches(request.if_none_match, etag):
+            return add_validators(Response(status=304), etag, last_modified)
+        return None
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have second precision
+        if last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None):
+            return add_validators(Response(status=304), etag, last_modified)
+    return None
+
+
+def add_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Let clients cache the body but always revalidate it
+    response.cache_control.no_cache = True
+    return response
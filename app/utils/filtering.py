@@ -0,0 +1,135 @@
+import re
+from datetime import datetime
+from sqlalchemy import Boolean, DateTime, Integer
+from ..models.client import Client
+from ..models.document import Document
+from ..models.session import Session
+
+# Query parameters that belong to pagination or the view rather than the filter language
+RESERVED_PARAMS = {'limit', 'after', 'sort'}
+
+OPERATORS = {
+    'eq': lambda column, value: column == value,
+    'ne': lambda column, value: column != value,
+    'in': lambda column, values: column.in_(values),
+    'gt': lambda column, value: column > value,
+    'gte': lambda column, value: column >= value,
+    'lt': lambda column, value: column < value,
+    'lte': lambda column, value: column <= value,
+}
+
+EQUALITY = ('eq', 'ne', 'in')
+RANGE = ('eq', 'gt', 'gte', 'lt', 'lte')
+
+_PARAM = re.compile(r"^(\w+)(?:\[(\w+)\])?$")
+
+
+def parse_value(column, raw):
+    """Convert a query-string value to the column's Python type."""
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        if raw.lower() not in ('true', 'false'):
+            raise ValueError(f"'{raw}' is not a boolean (use true or false)")
+        return raw.lower() == 'true'
+    if isinstance(column_type, Integer):
+        try:
+            return int(raw)
+        except ValueError:
+            raise ValueError(f"'{raw}' is not an integer")
+    if isinstance(column_type, DateTime):
+        try:
+            value = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"'{raw}' is not an ISO date (e.g., 2023-01-01T12:00:00Z)")
+        # Timestamps are stored as naive UTC
+        if value.tzinfo is not None:
+            value = (value - value.utcoffset()).replace(tzinfo=None)
+        return value
+    return raw
+
+
+class ListSpec:
+    """Per-model whitelist of filterable and sortable fields for a list endpoint.
+
+    `filters` maps public field names to (column, allowed operators) and `sorts`
+    maps public field names to columns. Only indexed columns belong here, so every
+    filter and sort compiles to an index lookup or an index scan.
+    """
+
+    def __init__(self, model, filters, sorts):
+        self.model = model
+        self.filters = filters
+        self.sorts = sorts
+
+    def parse(self, args, reserved=()):
+        """Return (criteria, sort) from the request args, raising ValueError for anything not whitelisted.
+
+        `sort` is (column, descending), with a None column for primary key order.
+        """
+        criteria = []
+        for key, raw in args.items(multi=True):
+            if key in RESERVED_PARAMS or key in reserved:
+                continue
+            match = _PARAM.match(key)
+            if not match or match.group(1) not in self.filters:
+                raise ValueError(f"Unknown filter field: {key}")
+            field, operator = match.group(1), match.group(2) or 'eq'
+            column, allowed = self.filters[field]
+            if operator not in allowed:
+                raise ValueError(f"Operator '{operator}' is not supported for {field} (use {', '.join(allowed)})")
+            try:
+                if operator == 'in':
+                    value = [parse_value(column, part) for part in raw.split(',')]
+                else:
+                    value = parse_value(column, raw)
+            except ValueError as e:
+                raise ValueError(f"Invalid value for {field}: {e}")
+            criteria.append(OPERATORS[operator](column, value))
+
+        sort = (None, False)
+        if args.get('sort'):
+            field = args['sort']
+            descending = field.startswith('-')
+            field = field.lstrip('-')
+            if field == 'id':
+                sort = (None, descending)
+            elif field in self.sorts:
+                sort = (self.sorts[field], descending)
+            else:
+                raise ValueError(f"Cannot sort by {field} (use {', '.join(['id', *self.sorts])})")
+        return criteria, sort
+
+
+CLIENT_LIST = ListSpec(Client, filters={
+    'status': (Client.status, EQUALITY),
+    'source': (Client.source, EQUALITY),
+    'createdAt': (Client.created_at, RANGE),
+    'updatedAt': (Client.updated_at, RANGE),
+}, sorts={
+    'name': Client.name,
+    'status': Client.status,
+    'createdAt': Client.created_at,
+    'updatedAt': Client.updated_at,
+})
+
+SESSION_LIST = ListSpec(Session, filters={
+    'completed': (Session.completed, ('eq',)),
+    'category': (Session.category, EQUALITY),
+    'date': (Session.date, RANGE),
+    'updatedAt': (Session.updated_at, RANGE),
+}, sorts={
+    'date': Session.date,
+    'updatedAt': Session.updated_at,
+})
+
+DOCUMENT_LIST = ListSpec(Document, filters={
+    'sent': (Document.sent, ('eq',)),
+    'type': (Document.type, EQUALITY),
+    'sentDate': (Document.sent_date, RANGE),
+    'createdAt': (Document.created_at, RANGE),
+    'updatedAt': (Document.updated_at, RANGE),
+}, sorts={
+    'createdAt': Document.created_at,
+    'sentDate': Document.sent_date,
+    'updatedAt': Document.updated_at,
+})
@@ -0,0 +1,324 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate, chain
+from random import Random
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from ..models import db
+from ..models.client import Client
+from ..models.document import Document
+from ..models.session import Session
+from .id_allocator import DEFAULT_DISPLAY_ID_WIDTH, DISPLAY_ID_PREFIXES
+from .search import index_loaded
+from .stats import rebuild
+
+logger = logging.getLogger(__name__)
+
+LOADED_TABLES = ('clients', 'sessions', 'documents')
+# id_sequences entities of the same tables
+ENTITIES = ('client', 'session', 'document')
+# Clients generated per executemany round; their sessions and documents go in the same round
+BATCH_SIZE = 10_000
+
+OBJECTIVE = 'Counselling Objective'
+SUMMARY = 'Session Summary'
+ASSESSMENT = 'Assessment Details'
+
+# status -> (completed sessions, upcoming sessions, documents, documents sent), following test_data.sql:
+# no sessions until a first one is booked, and a summary and assessment once two are done. The first
+# `sent` documents have gone out; the assessment of a client with no follow-up booked yet is a draft
+STATUS_PLANS = {
+    'Initial Contact': (0, 0, (), 0),
+    'Info Shared': (0, 0, (OBJECTIVE,), 1),
+    'Decision Pending': (0, 0, (OBJECTIVE,), 1),
+    'First Session Scheduled': (0, 1, (OBJECTIVE,), 1),
+    'Second Session Completed': (2, 0, (SUMMARY, OBJECTIVE, ASSESSMENT), 2),
+    'Follow-up Scheduled': (2, 1, (OBJECTIVE, SUMMARY, ASSESSMENT), 3),
+}
+STATUS_WEIGHTS = {
+    'Initial Contact': 15,
+    'Info Shared': 20,
+    'Decision Pending': 10,
+    'First Session Scheduled': 15,
+    'Second Session Completed': 25,
+    'Follow-up Scheduled': 15,
+}
+
+# Clients without an upcoming session were last active up to this many days ago
+HISTORY_DAYS = 365
+# Days relative to the client's latest activity, as in test_data.sql
+COMPLETED_SESSION_DAYS = (-15, -5)
+FIRST_UPCOMING_DAYS = 5
+FOLLOW_UP_DAYS = 25
+SENT_DAYS = {OBJECTIVE: -20, SUMMARY: -3, ASSESSMENT: -3}
+
+SESSION_NOTES = (
+    'Discussed career goals and aspirations. Used Life Design Counselling framework.',
+    'Developed actionable goals based on LDC process framework.',
+    'Follow-up session to review progress on goals.',
+)
+CATEGORIES = ('Initial Consultation', 'Career Assessment', 'Strategy Session', 'Follow-up')
+DOCUMENT_CONTENT = {
+    OBJECTIVE: 'Initial counselling objectives focusing on career transition and skill development.',
+    SUMMARY: 'Summary of sessions including key insights and action items discussed.',
+    ASSESSMENT: 'Detailed assessment of strengths, areas for growth, and recommended actions.',
+}
+CLIENT_NOTES = (
+    'Looking to transition from marketing to product management',
+    'Recent graduate looking for career guidance in tech industry',
+    'Considering a career change after 10 years in finance',
+    'Interested in exploring leadership development options',
+    'Looking for support with interview preparation',
+    'Returning to work after a career break',
+    'Wants to move from engineering into management',
+    None,
+)
+SOURCES = ('LinkedIn', 'Website', 'References', 'Phone', 'Referral', 'Event')
+FIRST_NAMES = (
+    'Alex', 'Jamie', 'Taylor', 'Morgan', 'Casey', 'Jordan', 'Riley', 'Avery', 'Quinn', 'Rowan',
+    'Sam', 'Charlie', 'Drew', 'Emerson', 'Finley', 'Harper', 'Hayden', 'Jesse', 'Kai', 'Logan',
+    'Micah', 'Noa', 'Parker', 'Reese', 'Robin', 'Sage', 'Skyler', 'Tatum', 'Elliot', 'Dakota',
+)
+LAST_NAMES = (
+    'Johnson', 'Smith', 'Davis', 'Lee', 'Wilson', 'Brown', 'Garcia', 'Martinez', 'Nguyen', 'Patel',
+    'Kim', 'Clark', 'Lewis', 'Walker', 'Hall', 'Young', 'King', 'Wright', 'Lopez', 'Hill',
+    'Scott', 'Green', 'Adams', 'Baker', 'Nelson', 'Carter', 'Mitchell', 'Perez', 'Roberts', 'Turner',
+)
+
+# table -> (INSERT prefix, one row's VALUES tuple); every row starts at version 1
+_INSERTS = {
+    'clients': (
+        "INSERT INTO clients (id, display_id, name, email, phone, source, status, notes, created_at, updated_at, "
+        "version) VALUES ",
+        "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
+    ),
+    'sessions': (
+        "INSERT INTO sessions (id, display_id, client_id, session_number, date, category, completed, notes, "
+        "zoom_link, updated_at, version) VALUES ",
+        "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
+    ),
+    'documents': (
+        "INSERT INTO documents (id, display_id, client_id, type, content, content_length, content_hash, sent, "
+        "sent_date, created_at, updated_at, version) VALUES ",
+        "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
+    ),
+}
+# Several rows per INSERT cut the per-row cost of executemany by about a quarter; 999 is
+# the SQLITE_MAX_VARIABLE_NUMBER of SQLite builds before 3.32
+MAX_VARIABLES = 999
+# Page cache for the load's connection (KiB, as a negative cache_size): recreating the indexes
+# sorts every loaded row, and spilling the sort to the WAL mid-transaction costs about a fifth
+LOAD_CACHE_KIB = 256 * 1024
+
+
+class FixtureGenerator:
+    """Synthetic clients with the sessions and documents their status implies.
+
+    Row ids and display numbers continue from the given starting points, so the rows
+    can be inserted as they are; the same seed always produces the same data.
+    """
+
+    def __init__(self, next_ids, next_numbers, seed=0, now=None, width=DEFAULT_DISPLAY_ID_WIDTH):
+        self.rng = Random(seed)
+        now = now or datetime.utcnow()
+        today = datetime(now.year, now.month, now.day)
+        self.now_minute = now.hour * 60 + now.minute
+        # Timestamps are assembled from day and time-of-day strings in the format SQLAlchemy
+        # writes DateTime columns in; formatting a datetime per value would dominate generation
+        self.days = {
+            offset: (today + timedelta(days=offset)).strftime('%Y-%m-%d')
+            for offset in range(-HISTORY_DAYS - 60, 60)
+        }
+        self.times = [f" {minute // 60:02d}:{minute % 60:02d}:00.000000" for minute in range(1440)]
+        self.next_ids = dict(next_ids)
+        self.next_numbers = dict(next_numbers)
+        self.width = width
+        self.statuses = list(STATUS_WEIGHTS)
+        self.cum_weights = list(accumulate(STATUS_WEIGHTS.values()))
+        # (name, email prefix) for every first and last name pair
+        self.names = [(f"{first} {last}", f"{first.lower()}.{last.lower()}.") for first in FIRST_NAMES for last in LAST_NAMES]
+        # document type -> (type, content, content_length, content_hash)
+        self.bodies = {kind: (kind, content, *Document.fingerprint(content)) for kind, content in DOCUMENT_CONTENT.items()}
+
+    def batch(self, size):
+        """Rows for `size` clients as (clients, sessions, documents) lists of insert tuples."""
+        rand, days, times, width = self.rng.random, self.days, self.times, self.width
+        names, bodies = self.names, self.bodies
+        client_id, session_id, document_id = (self.next_ids[table] for table in LOADED_TABLES)
+        client_number, session_number, document_number = (self.next_numbers[entity] for entity in ENTITIES)
+        client_prefix, session_prefix, document_prefix = (f"{DISPLAY_ID_PREFIXES[entity]}-" for entity in ENTITIES)
+        clients, sessions, documents = [], [], []
+
+        for status in self.rng.choices(self.statuses, cum_weights=self.cum_weights, k=size):
+            completed, upcoming, document_types, sent_documents = STATUS_PLANS[status]
+            # Clients with a session booked are current; the rest were last active in the past year
+            if upcoming:
+                latest_day, latest_minute = 0, self.now_minute
+            else:
+                latest_day, latest_minute = -int(rand() * HISTORY_DAYS), int(rand() * 1440)
+            created_day = latest_day - 20 - int(rand() * 30)
+            created = days[created_day] + times[int(rand() * 1440)]
+            latest = days[latest_day] + times[latest_minute]
+            name, email = names[int(rand() * len(names))]
+            clients.append((
+                client_id, client_prefix + str(client_number).zfill(width), name, f"{email}{client_id}@example.com",
+                f"+1{2_000_000_000 + int(rand() * 8_000_000_000)}", SOURCES[int(rand() * len(SOURCES))], status,
+                CLIENT_NOTES[int(rand() * len(CLIENT_NOTES))], created,
+                latest if completed or document_types else created,
+            ))
+
+            for number in range(1, completed + upcoming + 1):
+                if number <= completed:
+                    day = latest_day + COMPLETED_SESSION_DAYS[number - 1] - int(rand() * 3)
+                    notes = SESSION_NOTES[number - 1]
+                else:
+                    day = (FOLLOW_UP_DAYS if completed else FIRST_UPCOMING_DAYS) + int(rand() * 7)
+                    notes = SESSION_NOTES[2] if completed else None
+                # Half-hour slots from 9:00 to 17:30
+                date = days[day] + times[540 + 30 * int(rand() * 18)]
+                sessions.append((
+                    session_id, session_prefix + str(session_number).zfill(width), client_id, number, date,
+                    CATEGORIES[0] if number == 1 else CATEGORIES[int(rand() * len(CATEGORIES))],
+                    number <= completed, notes, f"https://zoom.us/j/{1_000_000_000 + int(rand() * 9_000_000_000)}",
+                    date if number <= completed else created,
+                ))
+                session_id += 1
+                session_number += 1
+
+            sent_minute = int(rand() * 1440)
+            for number, kind in enumerate(document_types, 1):
+                written = days[latest_day + SENT_DAYS[kind]] + times[sent_minute]
+                documents.append((
+                    document_id, document_prefix + str(document_number).zfill(width), client_id, *bodies[kind],
+                    number <= sent_documents, written if number <= sent_documents else None, written, written,
+                ))
+                document_id += 1
+                document_number += 1
+
+            client_id += 1
+            client_number += 1
+
+        self.next_ids = dict(zip(LOADED_TABLES, (client_id, session_id, document_id)))
+        self.next_numbers = dict(zip(ENTITIES, (client_number, session_number, document_number)))
+        return clients, sessions, documents
+
+
+def _insert(connection, table, rows):
+    """executemany of multi-row INSERTs, with a shorter statement for the remainder."""
+    if not rows:
+        return
+    prefix, placeholders = _INSERTS[table]
+    per_statement = MAX_VARIABLES // len(rows[0])
+    whole = len(rows) - len(rows) % per_statement
+    if whole:
+        connection.exec_driver_sql(
+            prefix + ", ".join([placeholders] * per_statement),
+            [tuple(chain.from_iterable(rows[start:start + per_statement])) for start in range(0, whole, per_statement)],
+        )
+    if whole < len(rows):
+        connection.exec_driver_sql(
+            prefix + ", ".join([placeholders] * (len(rows) - whole)),
+            [tuple(chain.from_iterable(rows[whole:]))],
+        )
+
+
+def _deferred_ddl(connection):
+    """CREATE statements for the secondary indexes and triggers on the loaded tables.
+
+    Indexes backing UNIQUE constraints have no SQL of their own and stay in place.
+    """
+    return connection.exec_driver_sql(
+        "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL "
+        f"AND tbl_name IN ({', '.join(repr(table) for table in LOADED_TABLES)}) ORDER BY type, name"
+    ).all()
+
+
+def load(connection, clients, seed=0, batch_size=BATCH_SIZE, now=None, width=DEFAULT_DISPLAY_ID_WIDTH,
+         search_index=False):
+    """Generate `clients` clients with their sessions and documents and insert them in one transaction.
+
+    Secondary indexes and the stats triggers are dropped for the load and recreated
+    afterwards, the dashboard counters are recounted and the display_id sequences moved
+    past the new rows. The new rows are only searchable with `search_index`, which fills
+    the search index with one INSERT ... SELECT per table, or after `flask search rebuild`.
+    Returns row counts and timings.
+    """
+    started = time.perf_counter()
+    cache_size = connection.exec_driver_sql("PRAGMA cache_size").scalar()
+    connection.exec_driver_sql(f"PRAGMA cache_size = {-LOAD_CACHE_KIB}")
+    try:
+        # Take the write lock up front, so the DDL below is part of the same transaction
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        deferred = _deferred_ddl(connection)
+        for kind, name, _ in deferred:
+            connection.exec_driver_sql(f"DROP {kind.upper()} {name}")
+
+        next_ids = {
+            table: connection.exec_driver_sql(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").scalar()
+            for table in LOADED_TABLES
+        }
+        next_numbers = dict(connection.exec_driver_sql("SELECT entity, next_value + 1 FROM id_sequences").all())
+        generator = FixtureGenerator(next_ids, next_numbers, seed=seed, now=now, width=width)
+
+        rows = {table: 0 for table in LOADED_TABLES}
+        for offset in range(0, clients, batch_size):
+            batch = generator.batch(min(batch_size, clients - offset))
+            for table, values in zip(LOADED_TABLES, batch):
+                _insert(connection, table, values)
+                rows[table] += len(values)
+        loaded = time.perf_counter()
+
+        for _, _, sql in deferred:
+            connection.exec_driver_sql(sql)
+        if search_index:
+            index_loaded(connection, {model: next_ids[model.__tablename__] for model in (Client, Session, Document)})
+        connection.execute(
+            text("UPDATE id_sequences SET next_value = MAX(next_value, :last) WHERE entity = :entity"),
+            [{"entity": entity, "last": number - 1} for entity, number in generator.next_numbers.items()],
+        )
+        rebuild(connection)
+        finished = time.perf_counter()
+    finally:
+        # The connection goes back to the pool with its usual cache
+        connection.exec_driver_sql(f"PRAGMA cache_size = {cache_size}")
+
+    total = sum(rows.values())
+    logger.info(f"Loaded {total} fixture rows in {finished - started:.1f}s ({total / (finished - started):,.0f} rows/s).")
+    return {
+        "rows": rows,
+        "loadSeconds": loaded - started,
+        "indexSeconds": finished - loaded,
+        "rowsPerSecond": total / (finished - started),
+    }
+
+
+@click.group('fixtures')
+def fixtures_cli():
+    """Generate and load synthetic data."""
+
+
+@fixtures_cli.command('load')
+@click.option('--clients', type=int, default=10_000, show_default=True, help="Clients to generate.")
+@click.option('--seed', type=int, default=0, show_default=True, help="Random seed; the same seed gives the same data.")
+@click.option('--batch-size', type=int, default=BATCH_SIZE, show_default=True, help="Clients per executemany round.")
+@click.option('--search-index/--no-search-index', default=False, show_default=True,
+              help="Index the new rows for search in the same transaction, instead of with `flask search rebuild`.")
+@with_appcontext
+def load_command(clients, seed, batch_size, search_index):
+    """Generate clients, sessions and documents and bulk-load them into the database."""
+    width = current_app.extensions['id_allocator'].width
+    with db.engine.begin() as connection:
+        result = load(connection, clients, seed=seed, batch_size=batch_size, width=width, search_index=search_index)
+    rows = result["rows"]
+    total = sum(rows.values())
+    click.echo(
+        f"Loaded {rows['clients']} clients, {rows['sessions']} sessions and {rows['documents']} documents: "
+        f"inserted in {result['loadSeconds']:.1f}s ({total / result['loadSeconds']:,.0f} rows/s), then indexes, "
+        f"triggers{', search index' if search_index else ''} and counters in {result['indexSeconds']:.1f}s "
+        f"({result['rowsPerSecond']:,.0f} rows/s overall)."
+    )
+    if not search_index:
+        click.echo("The new rows are not searchable until `flask search rebuild` has run.")
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from itertools import islice
+from ..models import db
+from ..models.client import Client
+from ..models.session import Session
+
+ICS_MIMETYPE = 'text/calendar'
+ICS_BATCH_SIZE = 500
+PRODID = '-//Mylo//Sessions//EN'
+# UIDs must stay the same however the feed is reached, so they don't use the request host
+UID_DOMAIN = 'mylo'
+
+
+def escape_text(value):
+    # RFC 5545 3.3.11: backslash, semicolon, comma and newlines are escaped in TEXT values
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line at 75 octets (RFC 5545 3.1) without splitting a UTF-8 sequence."""
+    if len(line.encode('utf-8')) <= 75:
+        return line + '\r\n'
+    parts = []
+    current, size = '', 0
+    limit = 75
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            parts.append(current)
+            # Continuation lines start with a space, which counts towards their 75 octets
+            current, size, limit = '', 0, 74
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    # Stored timestamps are naive UTC
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def feed_query(since, client_id=None):
+    """Sessions from `since` onwards in date order, with the client's name, as Row tuples."""
+    query = db.session.query(
+        Session.display_id, Session.session_number, Session.date, Session.category,
+        Session.notes_text.label('notes'), Session.zoom_link, Session.updated_at, Client.name,
+    ).join(Client).filter(Session.date >= since)
+    if client_id is not None:
+        query = query.filter(Session.client_id == client_id)
+    return query.order_by(Session.date, Session.id)
+
+
+def _event_lines(row, duration, stamp):
+    summary = f"Session {row.session_number} with {row.name}"
+    if row.category:
+        summary += f" - {row.category}"
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{row.display_id}@{UID_DOMAIN}',
+        # The row's own timestamp keeps the body (and its ETag) stable between polls
+        f'DTSTAMP:{format_utc(row.updated_at or stamp)}',
+        f'DTSTART:{format_utc(row.date)}',
+        f'DTEND:{format_utc(row.date + duration)}',
+        f'SUMMARY:{escape_text(summary)}',
+    ]
+    if row.notes:
+        lines.append(f'DESCRIPTION:{escape_text(row.notes)}')
+    if row.zoom_link:
+        lines.append(f'LOCATION:{escape_text(row.zoom_link)}')
+        lines.append(f'URL:{row.zoom_link}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def render_feed(query, name, duration_minutes, stamp):
+    """Yield the VCALENDAR body in chunks, one per batch of sessions read from a server-side cursor.
+
+    `stamp` is the DTSTAMP for sessions that have never been updated.
+    """
+    duration = timedelta(minutes=duration_minutes)
+    yield ''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ))
+    rows = iter(query.yield_per(ICS_BATCH_SIZE))
+    while True:
+        batch = list(islice(rows, ICS_BATCH_SIZE))
+        if not batch:
+            break
+        yield ''.join(_event_lines(row, duration, stamp) for row in batch)
+    yield fold('END:VCALENDAR')
@@ -0,0 +1,85 @@
+import logging
+import threading
+from flask import current_app
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+DISPLAY_ID_PREFIXES = {
+    'client': 'CLIENT',
+    'session': 'SESSION',
+    'document': 'DOCUMENT',
+}
+# Zero-padding for display numbers. Wide enough that ids of one width sort as text in
+# numeric order up to 99,999,999; a number past that still formats, just wider
+DEFAULT_DISPLAY_ID_WIDTH = 8
+
+
+class IdAllocator:
+    """Hands out display_id numbers from the id_sequences table using hi/lo blocks.
+
+    Each process reserves `block_size` numbers at a time with a single UPDATE on the
+    entity's sequence row, then serves them from memory. The UPDATE is atomic in the
+    database, so blocks never overlap across worker processes; numbers left in a
+    block when a process exits are skipped, never reused.
+    """
+
+    def __init__(self, engine, block_size=50, width=DEFAULT_DISPLAY_ID_WIDTH):
+        self.engine = engine
+        self.block_size = block_size
+        self.width = width
+        self._lock = threading.Lock()
+        # entity -> [next value to hand out, last value in the reserved block]
+        self._blocks = {}
+
+    def _reserve(self, entity, size):
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text("UPDATE id_sequences SET next_value = next_value + :size WHERE entity = :entity"),
+                {"size": size, "entity": entity},
+            )
+            if result.rowcount != 1:
+                raise RuntimeError(f"No id sequence configured for '{entity}'")
+            high = conn.execute(
+                text("SELECT next_value FROM id_sequences WHERE entity = :entity"),
+                {"entity": entity},
+            ).scalar()
+        logger.info(f"Reserved {entity} ids {high - size + 1}-{high}.")
+        return high - size + 1, high
+
+    def allocate(self, entity, count=1):
+        """Return `count` unused sequence numbers for the entity."""
+        values = []
+        with self._lock:
+            while len(values) < count:
+                block = self._blocks.get(entity)
+                if block is None or block[0] > block[1]:
+                    # Reserve enough for the whole request in one round trip
+                    low, high = self._reserve(entity, max(self.block_size, count - len(values)))
+                    block = self._blocks[entity] = [low, high]
+                take = min(count - len(values), block[1] - block[0] + 1)
+                values.extend(range(block[0], block[0] + take))
+                block[0] += take
+        return values
+
+    def format(self, entity, value):
+        return f"{DISPLAY_ID_PREFIXES[entity]}-{value:0{self.width}d}"
+
+    def display_ids(self, entity, count):
+        return [self.format(entity, value) for value in self.allocate(entity, count)]
+
+
+def init_app(app, engine):
+    app.extensions['id_allocator'] = IdAllocator(
+        engine,
+        block_size=app.config.get('ID_BLOCK_SIZE', 50),
+        width=app.config.get('DISPLAY_ID_WIDTH', DEFAULT_DISPLAY_ID_WIDTH),
+    )
+
+
+def next_display_id(entity):
+    return current_app.extensions['id_allocator'].display_ids(entity, 1)[0]
+
+
+def next_display_ids(entity, count):
+    return current_app.extensions['id_allocator'].display_ids(entity, count)
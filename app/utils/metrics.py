@@ -0,0 +1,278 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from flask import request
+from sqlalchemy import event
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'mylo'
+
+# Histogram upper bounds; each histogram also has an implicit +Inf bucket
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# Requests that matched no route are recorded under this handler
+UNMATCHED = '(unmatched)'
+
+
+class _Histogram:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.sum += other.sum
+
+
+class _HandlerStats:
+    __slots__ = ('latency', 'sizes', 'statements', 'statuses', 'sql_statements', 'sql_seconds')
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.sizes = _Histogram(SIZE_BUCKETS)
+        self.statements = _Histogram(STATEMENT_BUCKETS)
+        self.statuses = {}
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.sizes.merge(other.sizes)
+        self.statements.merge(other.statements)
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.sql_statements += other.sql_statements
+        self.sql_seconds += other.sql_seconds
+
+
+class _Shard:
+    """One thread's counters. Only the owning thread writes to it, so updates need no lock."""
+    __slots__ = ('handlers', 'in_flight', 'started', 'sql_started', 'statements', 'sql_seconds')
+
+    def __init__(self):
+        self.handlers = {}
+        self.in_flight = 0
+        self.started = None
+        self.sql_started = None
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+    def handler(self, name):
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = _HandlerStats()
+        return stats
+
+
+class _Registry:
+    """Every live thread's shard, plus the totals of threads that have exited.
+
+    The lock is only taken when a thread records its first request, when it
+    exits and when /metrics is scraped; the request path itself never waits.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.shards = set()
+        self.retired = _Shard()
+
+    def add(self, shard):
+        with self.lock:
+            self.shards.add(shard)
+
+    def retire(self, shard):
+        # Called once the owning thread is gone, so the shard is no longer written to
+        with self.lock:
+            self.shards.discard(shard)
+            self.retired.in_flight += shard.in_flight
+            for name, stats in shard.handlers.items():
+                self.retired.handler(name).merge(stats)
+
+    def collect(self):
+        """Merge every shard into {handler: _HandlerStats} and the in-flight count."""
+        totals = {}
+        with self.lock:
+            shards = [self.retired, *self.shards]
+            in_flight = 0
+            for shard in shards:
+                in_flight += shard.in_flight
+                # list() copies in one step, so a thread adding its first request to a
+                # handler while we read can't break the iteration
+                for name, stats in list(shard.handlers.items()):
+                    if name not in totals:
+                        totals[name] = _HandlerStats()
+                    totals[name].merge(stats)
+        return totals, in_flight
+
+
+class _Token:
+    pass
+
+
+class _Local(threading.local):
+    # Runs once per thread, the first time the thread touches the metrics
+    def __init__(self, registry):
+        self.shard = _Shard()
+        # Folded into the registry's retired totals when the thread (and its locals) go away
+        self.token = _Token()
+        weakref.finalize(self.token, registry.retire, self.shard)
+        registry.add(self.shard)
+
+
+class _Counted:
+    """A streamed body that counts its bytes and records the request when the server closes it.
+
+    Served by the request's own thread, so the SQL the body runs and the observations
+    all land in its shard, before the thread's next request resets the counters. The
+    server calls close() even when the body is never iterated (HEAD, or a client that
+    goes away first), which a generator's finally block would not see.
+    """
+
+    def __init__(self, source, original, sizes, record):
+        self.source = source
+        self.original = original
+        self.sizes = sizes
+        self.record = record
+        self.size = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.source:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.sizes.observe(self.size)
+            self.record()
+        finally:
+            if hasattr(self.original, 'close'):
+                self.original.close()
+
+
+class Metrics:
+    def __init__(self):
+        self.registry = _Registry()
+        self.local = _Local(self.registry)
+
+    def start_request(self):
+        shard = self.local.shard
+        shard.in_flight += 1
+        shard.statements = 0
+        shard.sql_seconds = 0.0
+        shard.started = time.perf_counter()
+
+    def end_request(self, response):
+        shard = self.local.shard
+        if shard.started is None:
+            return response
+        started = shard.started
+        stats = shard.handler(request.endpoint or UNMATCHED)
+        status = response.status_code
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+        def record():
+            stats.latency.observe(time.perf_counter() - started)
+            stats.statements.observe(shard.statements)
+            stats.sql_statements += shard.statements
+            stats.sql_seconds += shard.sql_seconds
+
+        size = response.content_length
+        if size is not None:
+            stats.sizes.observe(size)
+        elif response.is_streamed and not response.direct_passthrough:
+            # Streamed bodies run their queries and get their length as they are sent, so
+            # everything is recorded once the body is closed
+            response.response = _Counted(response.iter_encoded(), response.response, stats.sizes, record)
+            return response
+        record()
+        return response
+
+    def finish_request(self, exc=None):
+        shard = self.local.shard
+        if shard.started is not None:
+            shard.in_flight -= 1
+            shard.started = None
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.local.shard.sql_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        shard = self.local.shard
+        if shard.sql_started is not None:
+            shard.statements += 1
+            shard.sql_seconds += time.perf_counter() - shard.sql_started
+            shard.sql_started = None
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        totals, in_flight = self.registry.collect()
+        handlers = sorted(totals.items())
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def histogram(name, help_text, select):
+            header(name, 'histogram', help_text)
+            for handler, stats in handlers:
+                hist = select(stats)
+                cumulative = 0
+                for bound, count in zip((*hist.bounds, '+Inf'), hist.counts):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_{name}_bucket{{handler="{handler}",le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_{name}_sum{{handler="{handler}"}} {hist.sum}')
+                lines.append(f'{PREFIX}_{name}_count{{handler="{handler}"}} {cumulative}')
+
+        histogram('http_request_duration_seconds', "Time spent handling requests, by handler.",
+                  lambda stats: stats.latency)
+        header('http_requests_total', 'counter', "Requests handled, by handler and status code.")
+        for handler, stats in handlers:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'{PREFIX}_http_requests_total{{handler="{handler}",status="{status}"}} {count}')
+        header('http_requests_in_flight', 'gauge', "Requests currently being handled.")
+        lines.append(f'{PREFIX}_http_requests_in_flight {in_flight}')
+        histogram('http_response_size_bytes', "Response body sizes as sent, by handler.",
+                  lambda stats: stats.sizes)
+        histogram('db_statements_per_request', "SQL statements executed per request, by handler.",
+                  lambda stats: stats.statements)
+        header('db_statements_total', 'counter', "SQL statements executed while handling requests, by handler.")
+        for handler, stats in handlers:
+            lines.append(f'{PREFIX}_db_statements_total{{handler="{handler}"}} {stats.sql_statements}')
+        header('db_statement_seconds_total', 'counter', "Time spent executing SQL while handling requests, by handler.")
+        for handler, stats in handlers:
+            lines.append(f'{PREFIX}_db_statement_seconds_total{{handler="{handler}"}} {stats.sql_seconds}')
+        return "\n".join(lines) + "\n"
+
+
+def init_app(app, db):
+    """Record request and SQL metrics for every request.
+
+    Call after db.init_app, and before compression.init_app: after_request hooks run
+    in reverse order of registration, so response sizes are then measured as sent.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    metrics = app.extensions['metrics'] = Metrics()
+    app.before_request(metrics.start_request)
+    app.after_request(metrics.end_request)
+    app.teardown_request(metrics.finish_request)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', metrics.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', metrics.after_cursor_execute)
@@ -0,0 +1,160 @@
+import base64
+import json
+import logging
+from itertools import islice
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import Boolean, DateTime, Float, Integer, Numeric, String, and_, literal, or_, tuple_, type_coerce
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+STREAM_BATCH_SIZE = 500
+# (column, descending); a None column means primary key order
+DEFAULT_SORT = (None, False)
+
+
+def encode_cursor(values):
+    # Cursors are opaque to API consumers: a urlsafe base64 of the keyset values
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _cursor_types(column):
+    # The Python types a cursor's sort value may have for this column; datetimes travel as stored text
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return bool
+    if isinstance(column_type, Integer):
+        return int
+    if isinstance(column_type, (Float, Numeric)):
+        return (int, float)
+    return str
+
+
+def parse_page_args(args, sort=DEFAULT_SORT):
+    """Return (limit, after) when the request asks for a page, otherwise None.
+
+    `after` is the decoded keyset: (None, id) for the default id order, or
+    (sort value, id) when the list is sorted by another column.
+    """
+    if 'limit' not in args and 'after' not in args:
+        return None
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+
+    after = None
+    if args.get('after'):
+        values = decode_cursor(args['after'])
+        size = 1 if sort[0] is None else 2
+        if len(values) != size or not _is_id(values[-1]):
+            raise ValueError("Invalid cursor")
+        if size == 2 and values[0] is not None and not isinstance(values[0], _cursor_types(sort[0])):
+            raise ValueError("Invalid cursor")
+        after = (None if size == 1 else values[0], values[-1])
+
+    return limit, after
+
+
+def dumps(obj):
+    # Match jsonify's compact output so streamed and buffered bodies are identical
+    return current_app.json.dumps(obj, separators=(",", ":"))
+
+
+def _sort_value(column):
+    # Datetimes are compared as the stored text, so the cursor carries the exact value
+    # and no precision is lost converting it back and forth
+    return type_coerce(column, String) if isinstance(column.type, DateTime) else column
+
+
+def ordering(model, sort=DEFAULT_SORT):
+    """ORDER BY clauses for a sort, with the primary key as the tiebreaker."""
+    column, descending = sort
+    columns = [model.id] if column is None else [column, model.id]
+    return [c.desc() if descending else c for c in columns]
+
+
+def _after(model, sort, after):
+    column, descending = sort
+    value, last_id = after
+    if column is None:
+        return model.id < last_id if descending else model.id > last_id
+    column = _sort_value(column)
+    if value is None:
+        # SQLite sorts NULLs first ascending and last descending
+        if descending:
+            return and_(column.is_(None), model.id < last_id)
+        return or_(and_(column.is_(None), model.id > last_id), column.isnot(None))
+    if descending:
+        return or_(tuple_(column, model.id) < tuple_(literal(value), literal(last_id)), column.is_(None))
+    return tuple_(column, model.id) > tuple_(literal(value), literal(last_id))
+
+
+def keyset_page(query, model, limit, after, plan, sort=DEFAULT_SORT):
+    """Fetch one page of plan rows in sort order, starting after the given keyset."""
+    column, _ = sort
+    if column is not None:
+        # The sort value rides at the end of each row for the next cursor
+        query = query.add_columns(_sort_value(column))
+    if after is not None:
+        query = query.filter(_after(model, sort, after))
+    rows = query.order_by(*ordering(model, sort)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[0]] if column is None else [last[-1], last[0]])
+
+    return {
+        "items": plan.rows(rows),
+        "nextCursor": next_cursor,
+    }
+
+
+def stream_json_array(query, plan, batch_size=STREAM_BATCH_SIZE):
+    """Stream a JSON array from a server-side cursor, one chunk per batch of rows."""
+    rows = query.yield_per(batch_size)
+    encode = current_app.json.row_encoder(plan)
+    endpoint = request.endpoint
+
+    def generate():
+        count = 0
+        yield "["
+        try:
+            results = iter(rows)
+            while True:
+                batch = list(islice(results, batch_size))
+                if not batch:
+                    break
+                chunk = ",".join(map(encode, batch))
+                yield "," + chunk if count else chunk
+                count += len(batch)
+        except Exception as e:
+            # Headers are already sent, so the best we can do is log and cut the body short
+            logger.error(f"Error streaming response for {endpoint}: {e}")
+            raise
+        yield "]"
+        logger.info(f"Streamed {count} rows for {endpoint}.")
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -0,0 +1,175 @@
+import logging
+import os
+import sys
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+# Set on responses to requests that ran more statements than SQL_QUERY_BUDGET, so the failure
+# can be told apart from any other 500 (routes turn every exception into one)
+BUDGET_HEADER = 'X-SQL-Query-Budget-Exceeded'
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request runs more statements than SQL_QUERY_BUDGET."""
+
+
+class _RequestProfile:
+    __slots__ = ('count', 'shapes', 'origins', 'over_budget')
+
+    def __init__(self):
+        self.count = 0
+        # The first statement past the budget, if any
+        self.over_budget = None
+        # Statement text (parameters are bound separately, so it is the statement's shape) -> executions
+        self.shapes = {}
+        self.origins = {}
+
+
+def _route():
+    return f"{request.method} {request.path} ({request.endpoint})"
+
+
+def _compact(statement):
+    return " ".join(statement.split())
+
+
+def _origin():
+    """The innermost application frame outside this module, e.g. a to_dict() that lazy-loads."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(APP_ROOT) and filename != os.path.abspath(__file__):
+            return f"{os.path.relpath(filename, os.path.dirname(APP_ROOT))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def explain(cursor, statement, parameters, executemany):
+    """EXPLAIN QUERY PLAN for a statement, as indented lines like the sqlite3 shell prints."""
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    # The raw DBAPI connection runs it without going back through these event hooks
+    rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    depth = {0: 0}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, 0) + 1
+        lines.append("  " * depth[node] + detail)
+    return "\n".join(lines)
+
+
+class Profiler:
+    def __init__(self, slow_ms=None, repeat_threshold=None, budget=None, strict=True, explain_plans=True):
+        self.slow_seconds = slow_ms / 1000 if slow_ms is not None else None
+        self.repeat_threshold = repeat_threshold
+        self.budget = budget
+        self.strict = strict
+        self.explain_plans = explain_plans
+
+    def _profile(self):
+        profile = g.get('sql_profile')
+        if profile is None:
+            profile = g.sql_profile = _RequestProfile()
+        return profile
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            profile = self._profile()
+            profile.count += 1
+            if self.budget is not None and profile.count > self.budget:
+                if profile.over_budget is None:
+                    profile.over_budget = statement
+                if self.strict:
+                    raise QueryBudgetExceeded(
+                        f"{_route()} exceeded its budget of {self.budget} SQL statements: {_compact(statement)}"
+                    )
+        # Keyed by execution, so a statement that fails (and never reaches after_cursor_execute)
+        # can't leave its start time behind for the next one to pick up
+        conn.info.setdefault('profiler_started', {})[context] = time.perf_counter()
+
+    def handle_error(self, exception_context):
+        if exception_context.connection is not None:
+            exception_context.connection.info.get('profiler_started', {}).pop(exception_context.execution_context, None)
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('profiler_started', {}).pop(context, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        in_request = has_request_context()
+
+        if in_request and self.repeat_threshold is not None:
+            profile = self._profile()
+            count = profile.shapes.get(statement, 0) + 1
+            profile.shapes[statement] = count
+            if count == self.repeat_threshold:
+                profile.origins[statement] = _origin()
+
+        if self.slow_seconds is not None and elapsed >= self.slow_seconds:
+            where = _route() if in_request else "outside a request"
+            message = f"Slow query ({elapsed * 1000:.1f} ms) {where}: {_compact(statement)}"
+            if (
+                self.explain_plans
+                and conn.dialect.name == 'sqlite'
+                and statement.lstrip().upper().startswith(EXPLAINABLE)
+            ):
+                try:
+                    plan = explain(cursor, statement, parameters, executemany)
+                    if plan:
+                        message += "\n" + plan
+                except Exception as e:
+                    message += f"\n(EXPLAIN QUERY PLAN failed: {e})"
+            logger.warning(message)
+
+    def mark_response(self, response):
+        profile = g.get('sql_profile')
+        if profile is not None and profile.over_budget is not None:
+            response.headers[BUDGET_HEADER] = f"{profile.count}/{self.budget}"
+        return response
+
+    def finish_request(self, exc=None):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return
+        if profile.over_budget is not None:
+            logger.error(
+                f"{_route()} ran {profile.count} SQL statements, over its budget of {self.budget}; "
+                f"the first one over was: {_compact(profile.over_budget)}"
+            )
+        if self.repeat_threshold is None:
+            return
+        for statement, count in profile.shapes.items():
+            if count >= self.repeat_threshold:
+                logger.warning(
+                    f"Possible N+1 in {_route()}: the same statement ran {count} times, "
+                    f"repeating from {profile.origins[statement]}: {_compact(statement)}"
+                )
+
+
+def init_app(app, db):
+    """Hook the profiler into every engine when SQL_PROFILING or SQL_QUERY_BUDGET is set."""
+    profiling = app.config.get('SQL_PROFILING', False)
+    budget = app.config.get('SQL_QUERY_BUDGET')
+    if not profiling and budget is None:
+        return
+    profiler = app.extensions['sql_profiler'] = Profiler(
+        slow_ms=app.config.get('SQL_SLOW_QUERY_MS', 100) if profiling else None,
+        repeat_threshold=app.config.get('SQL_REPEAT_THRESHOLD', 10) if profiling else None,
+        budget=budget,
+        strict=app.config.get('SQL_QUERY_BUDGET_STRICT', True),
+        explain_plans=app.config.get('SQL_EXPLAIN_SLOW_QUERIES', True),
+    )
+    app.after_request(profiler.mark_response)
+    app.teardown_request(profiler.finish_request)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', profiler.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', profiler.after_cursor_execute)
+            event.listen(engine, 'handle_error', profiler.handle_error)
@@ -0,0 +1,319 @@
+import re
+from html import escape
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event, func, inspect, select, text
+from sqlalchemy.exc import OperationalError
+from ..models import db
+from ..models.client import Client
+from ..models.document import Document
+from ..models.session import Session
+from ..models.session_note import SessionNote
+from ..models.types import CompressedText
+
+SEARCH_TABLE = 'search_index'
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+SNIPPET_TOKENS = 12
+# snippet() marks matches with these private-use characters, which the stored text is escaped around
+# before they become <mark> tags, so user text never reaches the result as markup
+MATCH_START, MATCH_END = '\ue000', '\ue001'
+# FTS5 options while bulk indexing, and the defaults they are restored to unless set otherwise
+BULK_INDEX_SETTINGS = {'hashsize': 64 * 1024 * 1024, 'automerge': 0, 'crisismerge': 64}
+DEFAULT_INDEX_SETTINGS = {'hashsize': 1024 * 1024, 'automerge': 4, 'crisismerge': 16}
+# Compressed bodies decompressed and indexed per round by index_loaded
+INDEX_BATCH_SIZE = 500
+
+# model -> (kind, rowid tag, attribute holding the searchable text)
+SOURCES = {
+    Client: ('client', 1, 'notes'),
+    Session: ('session', 2, 'notes'),
+    Document: ('document', 3, 'content'),
+}
+KINDS = {kind: model for model, (kind, _, _) in SOURCES.items()}
+# Appended session notes are indexed one row per note (tag 0) and found as their session
+NOTE_TAG = 0
+
+# One FTS row per source row. The rowid encodes the source table and primary key so
+# updates and deletes are rowid lookups; `scope` holds the client and kind as indexed
+# tokens so both filters are answered by the full-text index rather than a scan.
+_DELETE = text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid")
+_INSERT = text(
+    f"INSERT INTO {SEARCH_TABLE} (rowid, body, scope, kind, ref_id, client_id) "
+    "VALUES (:rowid, :body, :scope, :kind, :ref_id, :client_id)"
+)
+
+_RESCOPE_NOTES = text(
+    f"UPDATE {SEARCH_TABLE} SET scope = :scope, client_id = :client_id "
+    f"WHERE rowid IN (SELECT id * 4 + {NOTE_TAG} FROM session_notes WHERE session_id = :session_id)"
+)
+_UNINDEX_NOTES = text(
+    f"DELETE FROM {SEARCH_TABLE} "
+    f"WHERE rowid IN (SELECT id * 4 + {NOTE_TAG} FROM session_notes WHERE session_id IN :session_ids)"
+).bindparams(bindparam('session_ids', expanding=True))
+
+_SEARCH = f"""
+    SELECT hits.kind, hits.snippet, hits.rank, c.display_id AS client_display_id,
+           CASE hits.kind WHEN 'client' THEN c.display_id WHEN 'session' THEN s.display_id ELSE d.display_id END AS display_id
+    FROM (
+        SELECT kind, ref_id, client_id, rank,
+               snippet({SEARCH_TABLE}, 0, :match_start, :match_end, '…', :tokens) AS snippet
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :match
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    ) AS hits
+    JOIN clients c ON c.id = hits.client_id
+    LEFT JOIN sessions s ON hits.kind = 'session' AND s.id = hits.ref_id
+    LEFT JOIN documents d ON hits.kind = 'document' AND d.id = hits.ref_id
+    ORDER BY hits.rank
+"""
+
+
+def search_rowid(model, ref_id):
+    return ref_id * 4 + SOURCES[model][1]
+
+
+def scope_tokens(kind, client_id):
+    return f"client{client_id} {kind}"
+
+
+def _client_id(model, target):
+    return target.id if model is Client else target.client_id
+
+
+def write_entries(connection, model, entries):
+    """Replace the index rows for (ref_id, client_id, body) entries; empty bodies are just removed."""
+    kind = SOURCES[model][0]
+    if not entries:
+        return
+    connection.execute(_DELETE, [{"rowid": search_rowid(model, ref_id)} for ref_id, _, _ in entries])
+    rows = [
+        {
+            "rowid": search_rowid(model, ref_id),
+            "body": body,
+            "scope": scope_tokens(kind, client_id),
+            "kind": kind,
+            "ref_id": ref_id,
+            "client_id": client_id,
+        }
+        for ref_id, client_id, body in entries
+        if body
+    ]
+    if rows:
+        connection.execute(_INSERT, rows)
+
+
+def index_loaded(connection, first_ids):
+    """Index rows bulk-loaded straight into the tables, given {model: first new id}.
+
+    One INSERT ... SELECT per table, with FTS5 buffering more terms in memory and
+    leaving segment merges to later writes while it runs. That only reads text stored
+    uncompressed; bodies stored as gzip BLOBs are then read back through the column
+    type and indexed with write_entries, a batch at a time.
+    """
+    keys = ', '.join(f"'{key}'" for key in BULK_INDEX_SETTINGS)
+    stored = dict(connection.execute(text(f"SELECT k, v FROM {SEARCH_TABLE}_config WHERE k IN ({keys})")).all())
+    _configure(connection, BULK_INDEX_SETTINGS)
+    for model, first_id in first_ids.items():
+        kind, tag, attribute = SOURCES[model]
+        client = 'id' if model is Client else 'client_id'
+        connection.execute(text(
+            f"""INSERT INTO {SEARCH_TABLE} (rowid, body, scope, kind, ref_id, client_id)
+                SELECT id * 4 + {tag}, {attribute}, 'client' || {client} || ' {kind}', '{kind}', id, {client}
+                FROM {model.__tablename__}
+                WHERE id >= :first_id AND typeof({attribute}) = 'text' AND {attribute} != ''"""
+        ), {"first_id": first_id})
+        table = model.__table__
+        if isinstance(table.c[attribute].type, CompressedText):
+            compressed = connection.execute(
+                select(table.c.id, table.c[client], table.c[attribute])
+                .where(table.c.id >= first_id, func.typeof(table.c[attribute]) == 'blob')
+            )
+            for rows in compressed.partitions(INDEX_BATCH_SIZE):
+                write_entries(connection, model, [tuple(row) for row in rows])
+    _configure(connection, {key: stored.get(key, default) for key, default in DEFAULT_INDEX_SETTINGS.items()})
+
+
+def rebuild_index(connection):
+    """Empty the search index and index every client, session, document and appended note again.
+
+    For databases filled without it, e.g. by `flask fixtures load` without --search-index.
+    Returns the number of index rows.
+    """
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    index_loaded(connection, {model: 0 for model in SOURCES})
+    connection.execute(text(
+        f"""INSERT INTO {SEARCH_TABLE} (rowid, body, scope, kind, ref_id, client_id)
+            SELECT n.id * 4 + {NOTE_TAG}, n.body, 'client' || s.client_id || ' session', 'session', s.id, s.client_id
+            FROM session_notes n JOIN sessions s ON s.id = n.session_id
+            WHERE n.body != ''"""
+    ))
+    return connection.execute(text(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")).scalar()
+
+
+def _configure(connection, settings):
+    for key, value in settings.items():
+        connection.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES (:key, :value)"),
+            {"key": key, "value": value},
+        )
+
+
+def rescope_notes(connection, moves):
+    """Point the appended notes of moved sessions, given as (session_id, client_id), at their new client."""
+    if moves:
+        connection.execute(_RESCOPE_NOTES, [
+            {"scope": scope_tokens('session', client_id), "client_id": client_id, "session_id": session_id}
+            for session_id, client_id in moves
+        ])
+
+
+def unindex_notes(connection, session_ids):
+    """Remove the index rows of every note appended to these sessions, before the notes themselves go."""
+    if session_ids:
+        connection.execute(_UNINDEX_NOTES, {"session_ids": list(session_ids)})
+
+
+def index_bulk(model, inserts=(), updates=()):
+    """Index rows written with executemany, which bypasses the mapper events.
+
+    `inserts` are column dicts carrying display_id, `updates` carry the primary key
+    as `id`. Called once per bulk chunk on the session's connection, so the index
+    commits (or rolls back) with the rows.
+    """
+    attribute = SOURCES[model][2]
+    entries = []
+
+    if inserts:
+        display_ids = [row['display_id'] for row in inserts]
+        ids = dict(db.session.query(model.display_id, model.id).filter(model.display_id.in_(display_ids)))
+        for row in inserts:
+            ref_id = ids[row['display_id']]
+            entries.append((ref_id, ref_id if model is Client else row['client_id'], row.get(attribute)))
+
+    # Updates that leave the text alone but move the row to another client still need a new scope
+    changed = [row for row in updates if attribute in row or (model is not Client and 'client_id' in row)]
+    if model is Session:
+        rescope_notes(db.session.connection(), [(row['id'], row['client_id']) for row in changed if 'client_id' in row])
+    if changed:
+        columns = [model.id, model.id if model is Client else model.client_id, getattr(model, attribute)]
+        current = {
+            row[0]: row[1:]
+            for row in db.session.query(*columns).filter(model.id.in_([row['id'] for row in changed]))
+        }
+        for row in changed:
+            client_id, body = current[row['id']]
+            entries.append((row['id'], row.get('client_id', client_id), row.get(attribute, body)))
+
+    write_entries(db.session.connection(), model, entries)
+
+
+def _after_insert(mapper, connection, target):
+    model = mapper.class_
+    attribute = SOURCES[model][2]
+    write_entries(connection, model, [(target.id, _client_id(model, target), getattr(target, attribute))])
+
+
+def _after_update(mapper, connection, target):
+    model = mapper.class_
+    attribute = SOURCES[model][2]
+    state = inspect(target)
+    # History never loads a deferred attribute, so untouched document bodies stay unread
+    moved = model is not Client and state.attrs.client_id.history.has_changes()
+    if state.attrs[attribute].history.has_changes() or moved:
+        write_entries(connection, model, [(target.id, _client_id(model, target), getattr(target, attribute))])
+    if moved and model is Session:
+        rescope_notes(connection, [(target.id, target.client_id)])
+
+
+def _after_delete(mapper, connection, target):
+    connection.execute(_DELETE, {"rowid": search_rowid(mapper.class_, target.id)})
+
+
+for _model in SOURCES:
+    event.listen(_model, 'after_insert', _after_insert)
+    event.listen(_model, 'after_update', _after_update)
+    event.listen(_model, 'after_delete', _after_delete)
+
+
+@event.listens_for(SessionNote, 'after_insert')
+def _after_note_insert(mapper, connection, target):
+    if not target.body:
+        return
+    client_id = connection.scalar(select(Session.client_id).where(Session.id == target.session_id))
+    connection.execute(_INSERT, {
+        "rowid": target.id * 4 + NOTE_TAG,
+        "body": target.body,
+        "scope": scope_tokens('session', client_id),
+        "kind": 'session',
+        "ref_id": target.session_id,
+        "client_id": client_id,
+    })
+
+
+@event.listens_for(SessionNote, 'after_delete')
+def _after_note_delete(mapper, connection, target):
+    connection.execute(_DELETE, {"rowid": target.id * 4 + NOTE_TAG})
+
+
+def match_expression(q, kind=None, client_id=None):
+    """Turn free text into an FTS5 query: every word must match, a trailing * makes it a prefix."""
+    terms = re.findall(r"\w+\*?", q)
+    if not terms:
+        raise ValueError("q must contain at least one word")
+    phrases = " ".join('"' + term.rstrip('*') + '"' + ('*' if term.endswith('*') else '') for term in terms)
+    expression = f"body : ({phrases})"
+    if kind is not None:
+        expression += f' AND scope : "{kind}"'
+    if client_id is not None:
+        expression += f' AND scope : "client{client_id}"'
+    return expression
+
+
+def highlight(snippet):
+    """HTML for a snippet: the text escaped, with matches wrapped in <mark>."""
+    return escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def search(q, kind=None, client_id=None, limit=DEFAULT_SEARCH_LIMIT, offset=0):
+    """Return ranked matches as dicts with the result's type, ids, highlighted snippet and score."""
+    params = {
+        "match": match_expression(q, kind, client_id),
+        "tokens": SNIPPET_TOKENS,
+        "match_start": MATCH_START,
+        "match_end": MATCH_END,
+        "limit": limit,
+        "offset": offset,
+    }
+    try:
+        rows = db.session.execute(text(_SEARCH), params).all()
+    except OperationalError:
+        # The first ranked query on a connection after another one changed the index settings
+        # (index_loaded does) fails with "SQL logic error"; it has reloaded them by then
+        rows = db.session.execute(text(_SEARCH), params).all()
+    return [
+        {
+            "type": row.kind,
+            "id": row.display_id,
+            "clientId": row.client_display_id,
+            "snippet": highlight(row.snippet),
+            # bm25 is negative with better matches lower; flip it so higher is better
+            "score": round(-row.rank, 6),
+        }
+        for row in rows
+    ]
+
+
+@click.group('search')
+def search_cli():
+    """Maintain the full-text search index."""
+
+
+@search_cli.command('rebuild')
+@with_appcontext
+def rebuild_command():
+    """Index every client, session, document and session note again from the source tables."""
+    with db.engine.begin() as connection:
+        rows = rebuild_index(connection)
+    click.echo(f"Search index rebuilt with {rows} entries.")
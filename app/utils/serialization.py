@@ -0,0 +1,210 @@
+from json.encoder import encode_basestring, encode_basestring_ascii
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Boolean, DateTime, Integer
+from ..models import db
+from ..models.client import Client
+from ..models.document import Document
+from ..models.session import Session
+
+COMPACT_SEPARATORS = (",", ":")
+
+
+def _iso(value):
+    # isoformat() only produces ASCII, so it can be quoted without escaping
+    return '"' + value.isoformat() + '"'
+
+
+def _bool(value):
+    return "true" if value else "false"
+
+
+def _converter(column, quote, fallback):
+    """Pick the encoder for one column from its SQL type, checking the Python type at runtime."""
+    column_type = column.type
+    if isinstance(column_type, DateTime):
+        return lambda value: _iso(value) if hasattr(value, "isoformat") else fallback(value)
+    if isinstance(column_type, Boolean):
+        return lambda value: _bool(value) if value.__class__ is bool else fallback(value)
+    if isinstance(column_type, Integer):
+        return lambda value: int.__repr__(value) if value.__class__ is int else fallback(value)
+    return lambda value: quote(value) if value.__class__ is str else fallback(value)
+
+
+class FieldPlan:
+    """Serializes one model's public fields straight from Row tuples.
+
+    `fields` is a list of (key, column) pairs in the same shape as the model's
+    to_dict(). query() selects the primary key followed by those columns, with
+    `joins` applied for columns that live on a related table, so no ORM object
+    or intermediate dict is built per row.
+    """
+
+    def __init__(self, model, fields, joins=()):
+        self.model = model
+        self.fields = fields
+        self.keys = [key for key, _ in fields]
+        self.columns = [column for _, column in fields]
+        self.joins = joins
+        # to_dict() emits datetimes as isoformat() strings, not the provider's HTTP dates
+        self._datetimes = [isinstance(column.type, DateTime) for column in self.columns]
+
+    def query(self):
+        query = db.session.query(self.model.id, *self.columns)
+        for target in self.joins:
+            query = query.join(target)
+        return query
+
+    def rows(self, rows):
+        return PlannedRows(self, rows)
+
+    def as_dict(self, row):
+        return {
+            key: value.isoformat() if is_datetime and value is not None else value
+            for key, value, is_datetime in zip(self.keys, row[1:], self._datetimes)
+        }
+
+    def compile(self, sort_keys, ensure_ascii, fallback):
+        """Build an encoder that turns one row into a compact JSON object string."""
+        quote = encode_basestring_ascii if ensure_ascii else encode_basestring
+        fields = [(key, index, column) for index, (key, column) in enumerate(zip(self.keys, self.columns), start=1)]
+        if sort_keys:
+            fields.sort(key=lambda field: field[0])
+
+        steps = []
+        for position, (key, index, column) in enumerate(fields):
+            prefix = ("{" if position == 0 else ",") + quote(key) + ":"
+            steps.append((prefix, index, _converter(column, quote, fallback)))
+        steps = tuple(steps)
+
+        def encode(row):
+            parts = []
+            append = parts.append
+            for prefix, index, convert in steps:
+                value = row[index]
+                append(prefix)
+                append("null" if value is None else convert(value))
+            append("}")
+            return "".join(parts)
+
+        return encode
+
+
+class PlannedRows:
+    """A list of rows to be serialized with a FieldPlan when the response is encoded."""
+
+    def __init__(self, plan, rows):
+        self.plan = plan
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def as_dicts(self):
+        return [self.plan.as_dict(row) for row in self.rows]
+
+
+def _has_rows(obj):
+    # Planned rows are recognised at the top level or as a value of a top-level dict,
+    # which covers plain lists and {"items": ..., "nextCursor": ...} pages
+    if isinstance(obj, PlannedRows):
+        return True
+    return isinstance(obj, dict) and any(isinstance(value, PlannedRows) for value in obj.values())
+
+
+def _materialize(obj):
+    if isinstance(obj, PlannedRows):
+        return obj.as_dicts()
+    return {key: _materialize(value) for key, value in obj.items()}
+
+
+class ModelJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider with a fast path for PlannedRows.
+
+    Compact output (the default outside debug mode) is written from the field
+    plans and is byte-for-byte what the to_dict() + jsonify path produces.
+    Anything else, including indented debug output, falls back to the default
+    provider.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._encoders = {}
+
+    def row_encoder(self, plan):
+        key = (plan, self.sort_keys, self.ensure_ascii)
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = plan.compile(self.sort_keys, self.ensure_ascii, self._encode_value)
+            self._encoders[key] = encoder
+        return encoder
+
+    def _encode_value(self, value):
+        return super().dumps(value, separators=COMPACT_SEPARATORS)
+
+    def _encode_rows(self, planned):
+        return "[" + ",".join(map(self.row_encoder(planned.plan), planned.rows)) + "]"
+
+    def dumps(self, obj, **kwargs):
+        if not _has_rows(obj):
+            return super().dumps(obj, **kwargs)
+        if kwargs.get("indent") is not None or kwargs.get("separators") != COMPACT_SEPARATORS:
+            return super().dumps(_materialize(obj), **kwargs)
+
+        if isinstance(obj, PlannedRows):
+            return self._encode_rows(obj)
+        quote = encode_basestring_ascii if self.ensure_ascii else encode_basestring
+        items = sorted(obj.items()) if self.sort_keys else obj.items()
+        members = []
+        for key, value in items:
+            if isinstance(value, PlannedRows):
+                members.append(quote(key) + ":" + self._encode_rows(value))
+            else:
+                members.append(quote(key) + ":" + super().dumps(value, **kwargs))
+        return "{" + ",".join(members) + "}"
+
+
+CLIENT_PLAN = FieldPlan(Client, [
+    ("id", Client.display_id),
+    ("name", Client.name),
+    ("email", Client.email),
+    ("phone", Client.phone),
+    ("source", Client.source),
+    ("status", Client.status),
+    ("notes", Client.notes),
+    ("createdAt", Client.created_at),
+    ("updatedAt", Client.updated_at),
+])
+
+SESSION_PLAN = FieldPlan(Session, [
+    ("id", Session.display_id),
+    ("clientId", Client.display_id.label("client_display_id")),
+    ("sessionNumber", Session.session_number),
+    ("date", Session.date),
+    ("category", Session.category),
+    ("completed", Session.completed),
+    ("notes", Session.notes_text),
+    ("zoomLink", Session.zoom_link),
+], joins=[Client])
+
+CALENDAR_PLAN = FieldPlan(Session, SESSION_PLAN.fields + [
+    ("clientName", Client.name),
+], joins=[Client])
+
+_DOCUMENT_FIELDS = [
+    ("id", Document.display_id),
+    ("clientId", Client.display_id.label("client_display_id")),
+    ("type", Document.type),
+    ("sent", Document.sent),
+    ("sentDate", Document.sent_date),
+    ("createdAt", Document.created_at),
+    ("updatedAt", Document.updated_at),
+]
+
+DOCUMENT_SUMMARY_PLAN = FieldPlan(Document, _DOCUMENT_FIELDS + [
+    ("contentLength", Document.content_length),
+    ("contentHash", Document.content_hash),
+], joins=[Client])
+
+DOCUMENT_PLAN = FieldPlan(Document, _DOCUMENT_FIELDS + [
+    ("content", Document.content),
+], joins=[Client])
@@ -0,0 +1,140 @@
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+from ..models import db
+from ..models.session import Session
+
+STATS_TABLE = 'stats_counters'
+
+# metric -> (source table, SQL expression giving the row's bucket). Whether an open session is
+# upcoming or overdue changes with the clock rather than with a write, so that split is made at read time
+BUCKETS = {
+    'clients': ('clients', "{row}.status"),
+    'sessions': ('sessions', "CASE WHEN {row}.completed THEN 'completed' ELSE 'notCompleted' END"),
+    'documents': ('documents', "CASE WHEN {row}.sent THEN 'sent' ELSE 'unsent' END"),
+}
+# Only changes to these columns can move a row between buckets
+BUCKET_COLUMNS = {'clients': 'status', 'sessions': 'completed', 'documents': 'sent'}
+
+
+def _increment(metric, bucket):
+    return (
+        f"INSERT INTO {STATS_TABLE} (metric, key, value) VALUES ('{metric}', {bucket}, 1) "
+        "ON CONFLICT (metric, key) DO UPDATE SET value = value + 1;"
+    )
+
+
+def _decrement(metric, bucket):
+    return f"UPDATE {STATS_TABLE} SET value = value - 1 WHERE metric = '{metric}' AND key = {bucket};"
+
+
+def trigger_statements():
+    """DDL for the triggers that keep the counters in the same transaction as every write."""
+    statements = []
+    for metric, (table, bucket) in BUCKETS.items():
+        new, old = bucket.format(row="NEW"), bucket.format(row="OLD")
+        column = BUCKET_COLUMNS[metric]
+        statements += [
+            f"""CREATE TRIGGER IF NOT EXISTS {table}_stats_insert AFTER INSERT ON {table}
+                BEGIN {_increment(metric, new)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {table}_stats_delete AFTER DELETE ON {table}
+                BEGIN {_decrement(metric, old)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {table}_stats_update AFTER UPDATE OF {column} ON {table}
+                WHEN ({old}) IS NOT ({new})
+                BEGIN {_decrement(metric, old)} {_increment(metric, new)} END""",
+        ]
+    return statements
+
+
+def drop_trigger_statements():
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_stats_{action}"
+        for table, _ in BUCKETS.values()
+        for action in ('insert', 'delete', 'update')
+    ]
+
+
+def counts(connection):
+    """Return {metric: {bucket: count}} as stored in the summary table."""
+    result = {metric: {} for metric in BUCKETS}
+    rows = connection.execute(text(f"SELECT metric, key, value FROM {STATS_TABLE}"))
+    for metric, key, value in rows:
+        if value:
+            result.setdefault(metric, {})[key] = value
+    return result
+
+
+def rebuild(connection):
+    """Recount every bucket from the source tables and return the corrections made.
+
+    Runs in the caller's transaction, so readers see either the old or the new
+    counters. The result maps metric -> bucket -> (stored, actual) for every
+    bucket that had drifted.
+    """
+    stored = counts(connection)
+    connection.execute(text(f"DELETE FROM {STATS_TABLE}"))
+    for metric, (table, bucket) in BUCKETS.items():
+        connection.execute(text(
+            f"INSERT INTO {STATS_TABLE} (metric, key, value) "
+            f"SELECT '{metric}', {bucket.format(row=table)}, COUNT(*) FROM {table} GROUP BY 2"
+        ))
+    actual = counts(connection)
+
+    drift = {}
+    for metric in BUCKETS:
+        for key in set(stored[metric]) | set(actual[metric]):
+            before, after = stored[metric].get(key, 0), actual[metric].get(key, 0)
+            if before != after:
+                drift.setdefault(metric, {})[key] = (before, after)
+    return drift
+
+
+def dashboard():
+    """The dashboard aggregates: the summary table, plus an index count of overdue sessions."""
+    connection = db.session.connection()
+    stored = counts(connection)
+    # Past-due sessions are few and a range of ix_sessions_completed_date
+    overdue = connection.execute(
+        select(func.count()).select_from(Session.__table__)
+        .where(Session.completed.is_(False), Session.date < datetime.utcnow())
+    ).scalar()
+    clients = stored['clients']
+    sessions = stored['sessions']
+    documents = stored['documents']
+    return {
+        "clients": {
+            "total": sum(clients.values()),
+            "byStatus": dict(sorted(clients.items())),
+        },
+        "sessions": {
+            "total": sum(sessions.values()),
+            "completed": sessions.get('completed', 0),
+            "upcoming": sessions.get('notCompleted', 0) - overdue,
+            "overdue": overdue,
+        },
+        "documents": {
+            "total": sum(documents.values()),
+            "sent": documents.get('sent', 0),
+            "unsent": documents.get('unsent', 0),
+        },
+    }
+
+
+@click.group('stats')
+def stats_cli():
+    """Maintain the dashboard summary table."""
+
+
+@stats_cli.command('rebuild')
+@with_appcontext
+def rebuild_command():
+    """Recount the dashboard aggregates from the source tables."""
+    with db.engine.begin() as connection:
+        drift = rebuild(connection)
+    if not drift:
+        click.echo("Stats were accurate; counters rebuilt.")
+        return
+    for metric, buckets in sorted(drift.items()):
+        for key, (before, after) in sorted(buckets.items()):
+            click.echo(f"{metric}.{key}: {before} -> {after}")
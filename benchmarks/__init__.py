@@ -0,0 +1,18 @@
+import os
+import tempfile
+import config
+from app import create_app
+
+
+def make_app(db_path=None, **overrides):
+    # Builds the app against a throwaway SQLite file with all migrations applied
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="mylo-bench-"), "bench.db")
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+        # The same engine profile as the app, so results carry over
+        "SQLITE_PRAGMAS": config.SQLITE_PRAGMAS,
+        "AUTO_MIGRATE": True,
+    }
+    settings.update(overrides)
+    return create_app(type("BenchConfig", (), settings))
@@ -0,0 +1,413 @@
+"""Load test of every API endpoint: throughput, p50/p95/p99 latency and peak RSS per endpoint.
+
+Each endpoint is driven in-process through Flask's test client and over HTTP by a pool of
+threads against a local threaded server, after seeding a SQLite database at the given scale.
+
+    python -m benchmarks.api --scale 1k --requests 200 --threads 8
+    python -m benchmarks.api --scale 1k --save-baseline benchmarks/baseline-1k.json
+    python -m benchmarks.api --scale 1k --baseline benchmarks/baseline-1k.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from random import Random
+from urllib.parse import quote
+from werkzeug.serving import WSGIRequestHandler, make_server
+from . import make_app
+from .seed import SCALES, STATUSES, counts, sample_ids, seed
+
+SAMPLE_SIZE = 5000
+BULK_ITEMS = 100
+# Whole-table feeds run this many times fewer requests than the other cases
+HEAVY_DIVISOR = 20
+# p95 differences below this are noise, whatever the relative change
+NOISE_FLOOR_MS = 1.0
+
+
+class Case:
+    """One endpoint: `build(ctx)` returns (method, path, json body) or None when there is nothing left to do.
+
+    Responses of cases with `collect` set add the created display_id to that pool,
+    which the DELETE cases then consume.
+    """
+
+    def __init__(self, name, build, collect=None, heavy=False):
+        self.name = name
+        self.build = build
+        self.collect = collect
+        self.heavy = heavy
+
+
+class State:
+    def __init__(self, ids, since, tag):
+        self.ids = ids
+        self.tag = tag
+        self.since = since
+        self.created = defaultdict(list)
+        self.counter = itertools.count()
+
+
+class Context:
+    def __init__(self, state, rng):
+        self.state = state
+        self.rng = rng
+
+    def pick(self, table):
+        return self.rng.choice(self.state.ids[table])
+
+    def take(self, pool):
+        # list.pop() is atomic, so worker threads never delete the same row twice
+        try:
+            return self.state.created[pool].pop()
+        except IndexError:
+            return None
+
+    def unique(self):
+        return f"{self.state.tag}{next(self.state.counter)}"
+
+    def date(self):
+        return (datetime.utcnow() + timedelta(days=self.rng.randrange(-365, 365))).replace(microsecond=0)
+
+
+def _delete(path, pool):
+    def build(ctx):
+        display_id = ctx.take(pool)
+        return None if display_id is None else ("DELETE", path.format(display_id), None)
+    return build
+
+
+def _week(ctx):
+    start = ctx.date()
+    return "GET", f"/api/sessions/calendar?from={start.isoformat()}&to={(start + timedelta(days=7)).isoformat()}", None
+
+
+def cases():
+    return [
+        # Clients
+        Case("GET /clients", lambda c: ("GET", "/api/clients?limit=50", None)),
+        Case("GET /clients?filter&sort", lambda c: ("GET", f"/api/clients?status={quote(c.rng.choice(STATUSES))}&sort=-createdAt&limit=50", None)),
+        Case("GET /clients/<id>", lambda c: ("GET", f"/api/clients/{c.pick('clients')}", None)),
+        Case("POST /clients", lambda c: ("POST", "/api/clients", {
+            "name": "Load Test", "email": f"load{c.unique()}@example.com", "source": "Website"}), collect="clients"),
+        Case("PUT /clients/<id>", lambda c: ("PUT", f"/api/clients/{c.pick('clients')}", {"phone": f"555-{c.rng.randrange(10000):04d}"})),
+        Case("PUT /clients/<id>/status", lambda c: ("PUT", f"/api/clients/{c.pick('clients')}/status", {"status": c.rng.choice(STATUSES)})),
+        Case("GET /clients/<id>/dossier", lambda c: ("GET", f"/api/clients/{c.pick('clients')}/dossier", None)),
+        Case("POST /clients/bulk", lambda c: ("POST", "/api/clients/bulk", [
+            {"name": "Bulk Load", "email": f"bulk{c.unique()}@example.com"} for _ in range(BULK_ITEMS)])),
+        Case("DELETE /clients/<id>", _delete("/api/clients/{}", "clients")),
+        # Sessions
+        Case("GET /sessions", lambda c: ("GET", "/api/sessions?limit=50", None)),
+        Case("GET /sessions?filter&sort", lambda c: ("GET", "/api/sessions?completed=false&sort=date&limit=50", None)),
+        Case("GET /sessions/<id>", lambda c: ("GET", f"/api/sessions/{c.pick('sessions')}", None)),
+        Case("GET /clients/<id>/sessions", lambda c: ("GET", f"/api/clients/{c.pick('clients')}/sessions", None)),
+        Case("POST /sessions", lambda c: ("POST", "/api/sessions", {
+            "clientId": c.pick('clients'), "sessionNumber": c.rng.randrange(1, 10), "date": c.date().isoformat()}),
+            collect="sessions"),
+        Case("PUT /sessions/<id>", lambda c: ("PUT", f"/api/sessions/{c.pick('sessions')}", {"category": "Follow-up"})),
+        Case("POST /sessions/<id>/complete", lambda c: ("POST", f"/api/sessions/{c.pick('sessions')}/complete", None)),
+        Case("POST /sessions/<id>/zoom", lambda c: ("POST", f"/api/sessions/{c.pick('sessions')}/zoom", {
+            "zoomLink": f"https://zoom.us/j/{c.rng.randrange(10**9, 10**10)}"})),
+        Case("POST /sessions/<id>/notes", lambda c: ("POST", f"/api/sessions/{c.pick('sessions')}/notes", {
+            "notes": "Followed up on the action plan."})),
+        Case("POST /sessions/bulk", lambda c: ("POST", "/api/sessions/bulk", [
+            {"id": c.pick('sessions'), "completed": True} for _ in range(BULK_ITEMS)])),
+        Case("GET /sessions/calendar", _week),
+        Case("GET /sessions/calendar.ics", lambda c: ("GET", "/api/sessions/calendar.ics", None), heavy=True),
+        Case("GET /clients/<id>/sessions.ics", lambda c: ("GET", f"/api/clients/{c.pick('clients')}/sessions.ics", None)),
+        Case("DELETE /sessions/<id>", _delete("/api/sessions/{}", "sessions")),
+        # Documents
+        Case("GET /documents", lambda c: ("GET", "/api/documents?limit=50", None)),
+        Case("GET /documents?view=full", lambda c: ("GET", "/api/documents?view=full&limit=50", None)),
+        Case("GET /documents/<id>", lambda c: ("GET", f"/api/documents/{c.pick('documents')}", None)),
+        Case("GET /clients/<id>/documents", lambda c: ("GET", f"/api/clients/{c.pick('clients')}/documents", None)),
+        Case("POST /documents", lambda c: ("POST", "/api/documents", {
+            "clientId": c.pick('clients'), "type": "Session Summary", "content": "Summary of the session. " * 40}),
+            collect="documents"),
+        Case("PUT /documents/<id>", lambda c: ("PUT", f"/api/documents/{c.pick('documents')}", {"type": "Career Plan"})),
+        Case("POST /documents/<id>/send", lambda c: ("POST", f"/api/documents/{c.pick('documents')}/send", None)),
+        Case("POST /documents/<id>/unsend", lambda c: ("POST", f"/api/documents/{c.pick('documents')}/unsend", None)),
+        Case("GET /documents/<id>/download", lambda c: ("GET", f"/api/documents/{c.pick('documents')}/download", None)),
+        Case("POST /documents/bulk", lambda c: ("POST", "/api/documents/bulk", [
+            {"id": c.pick('documents'), "sent": True} for _ in range(BULK_ITEMS)])),
+        Case("DELETE /documents/<id>", _delete("/api/documents/{}", "documents")),
+        # Everything else
+        Case("GET /export?updated_since", lambda c: ("GET", f"/api/export?updated_since={c.state.since}", None), heavy=True),
+        Case("GET /search", lambda c: ("GET", f"/api/search?q={c.rng.choice(['career', 'goals', 'interview*', 'network'])}", None)),
+        Case("GET /search?clientId", lambda c: ("GET", f"/api/search?q=session&clientId={c.pick('clients')}", None)),
+        Case("GET /stats", lambda c: ("GET", "/api/stats", None)),
+        Case("GET /cache/stats", lambda c: ("GET", "/api/cache/stats", None)),
+        Case("GET /metrics", lambda c: ("GET", "/metrics", None)),
+    ]
+
+
+class TestClientDriver:
+    name = "test-client"
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def connect(self):
+        return self.client
+
+    def send(self, conn, method, path, body):
+        response = conn.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    # HTTP/1.1 keeps worker connections open between requests
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class HttpDriver:
+    name = "http"
+
+    def __init__(self, app):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        return http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=300)
+
+    def send(self, conn, method, path, body):
+        payload, headers = None, {}
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        self.server.shutdown()
+
+
+class RssSampler(threading.Thread):
+    """Highest resident set size seen while a case runs."""
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        return max(self.peak, current_rss())
+
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs: fall back to the process's high-water mark (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def run_case(driver, case, state, requests, threads):
+    if case.heavy:
+        requests = max(1, requests // HEAVY_DIVISOR)
+    threads = max(1, min(threads, requests))
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+
+    def worker(index, count):
+        ctx = Context(state, Random(f"{driver.name}/{case.name}/{index}"))
+        conn = driver.connect()
+        local, local_statuses = [], Counter()
+        try:
+            for _ in range(count):
+                request = case.build(ctx)
+                if request is None:
+                    break
+                method, path, body = request
+                started = time.perf_counter()
+                status, data = driver.send(conn, method, path, body)
+                local.append(time.perf_counter() - started)
+                local_statuses[status] += 1
+                if case.collect and status == 201:
+                    state.created[case.collect].append(json.loads(data)["id"])
+        finally:
+            if conn is not getattr(driver, "client", None):
+                conn.close()
+        with lock:
+            latencies.extend(local)
+            statuses.update(local_statuses)
+
+    shares = [requests // threads + (1 if i < requests % threads else 0) for i in range(threads)]
+    sampler = RssSampler()
+    sampler.start()
+    started = time.perf_counter()
+    if threads == 1:
+        worker(0, shares[0])
+    else:
+        pool = [threading.Thread(target=worker, args=(i, share)) for i, share in enumerate(shares)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    peak = sampler.stop()
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "p50": percentile(ordered, 0.50) * 1000,
+        "p95": percentile(ordered, 0.95) * 1000,
+        "p99": percentile(ordered, 0.99) * 1000,
+        "peakRssMb": peak / (1024 * 1024),
+    }
+
+
+def print_results(driver, results, threads):
+    print(f"\n{driver} ({threads} thread{'s' if threads != 1 else ''})")
+    print(f"{'endpoint':<34}{'reqs':>6}{'errs':>6}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak RSS':>11}")
+    for name, r in results.items():
+        print(f"{name:<34}{r['requests']:>6}{r['errors']:>6}{r['throughput']:>10.1f}"
+              f"{r['p50']:>9.2f}{r['p95']:>9.2f}{r['p99']:>9.2f}{r['peakRssMb']:>8.1f} MB")
+
+
+def compare(report, baseline, tolerance):
+    """Print the change against a stored baseline and return the regressions found."""
+    if baseline["meta"].get("counts") != report["meta"]["counts"]:
+        print(f"\nwarning: baseline was recorded at {baseline['meta'].get('counts')}, this run is at {report['meta']['counts']}")
+    if baseline["meta"].get("machine") != report["meta"]["machine"]:
+        # Latencies only compare on the same hardware; the tolerance doesn't cover a different machine
+        print(f"\nwarning: baseline was recorded on {baseline['meta'].get('machine')}, this run is on {report['meta']['machine']}")
+    if baseline["meta"].get("notes"):
+        print(f"baseline notes: {baseline['meta']['notes']}")
+    regressions = []
+    for driver, results in report["results"].items():
+        print(f"\n{driver} vs. baseline")
+        print(f"{'endpoint':<34}{'p95 before':>12}{'p95 now':>10}{'change':>9}{'req/s before':>14}{'req/s now':>11}")
+        for name, r in results.items():
+            before = baseline["results"].get(driver, {}).get(name)
+            if before is None:
+                print(f"{name:<34}{'(new)':>12}")
+                continue
+            change = (r["p95"] - before["p95"]) / before["p95"] if before["p95"] else 0.0
+            slower = r["p95"] > before["p95"] * (1 + tolerance) and r["p95"] - before["p95"] > NOISE_FLOOR_MS
+            fewer = r["throughput"] < before["throughput"] * (1 - tolerance)
+            flag = "  REGRESSION" if slower or fewer else ""
+            print(f"{name:<34}{before['p95']:>12.2f}{r['p95']:>10.2f}{change:>+9.0%}"
+                  f"{before['throughput']:>14.1f}{r['throughput']:>11.1f}{flag}")
+            if flag:
+                regressions.append(f"{driver} {name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="1k", help="number of seeded clients")
+    parser.add_argument("--clients", type=int, help="seed this many clients instead of a named scale")
+    parser.add_argument("--db", help="keep the seeded database in this file and reuse it on later runs")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and driver")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent connections for the HTTP driver")
+    parser.add_argument("--drivers", default="test-client,http", help="comma-separated: test-client, http")
+    parser.add_argument("--only", help="only run endpoints whose name contains this text")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with a baseline; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/throughput change (default 25%%)")
+    parser.add_argument("--notes", help="free-text notes on the machine and conditions, stored with the results")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    clients = args.clients or SCALES[args.scale]
+    seeded = args.db or os.path.join(tempfile.mkdtemp(prefix="mylo-bench-"), "seed.db")
+    existing = counts(make_app(seeded))
+    if existing["clients"]:
+        print(f"Reusing {seeded}: {existing}")
+    else:
+        started = time.perf_counter()
+        existing = seed(make_app(seeded), clients)
+        print(f"Seeded {existing} in {time.perf_counter() - started:.1f}s")
+    # The run writes to a copy, so every run starts from the same rows
+    working = os.path.join(tempfile.mkdtemp(prefix="mylo-bench-"), "bench.db")
+    with sqlite3.connect(seeded) as source, sqlite3.connect(working) as target:
+        source.backup(target)
+    app = make_app(working)
+
+    ids = {table: sample_ids(app, table, SAMPLE_SIZE) for table in ("clients", "sessions", "documents")}
+    selected = [case for case in cases() if not args.only or args.only in case.name]
+    report = {
+        "meta": {
+            "counts": existing,
+            "requests": args.requests,
+            "threads": args.threads,
+            "python": platform.python_version(),
+            "machine": {
+                "platform": platform.platform(),
+                "arch": platform.machine(),
+                "cpus": os.cpu_count(),
+                "sqlite": sqlite3.sqlite_version,
+            },
+            "notes": args.notes,
+            "recordedAt": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        },
+        "results": {},
+    }
+
+    for name in args.drivers.split(","):
+        driver = {"test-client": TestClientDriver, "http": HttpDriver}[name.strip()](app)
+        threads = args.threads if driver.name == "http" else 1
+        # Each driver starts from the same ids; rows it creates are its own to delete
+        state = State(ids, datetime.utcnow().isoformat(timespec="seconds"), driver.name)
+        results = {}
+        try:
+            for case in selected:
+                results[case.name] = run_case(driver, case, state, args.requests, threads)
+        finally:
+            driver.close()
+        report["results"][driver.name] = results
+        print_results(driver.name, results, threads)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as out:
+            json.dump(report, out, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as stored:
+            regressions = compare(report, json.load(stored), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
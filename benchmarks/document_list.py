@@ -0,0 +1,47 @@
+"""Payload size and peak memory of GET /api/documents: summary view vs. full bodies.
+
+    python -m benchmarks.document_list --documents 500 --content-kb 200
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+from . import make_app
+
+
+def measure(client, url):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url)
+    body = response.get_data()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200, response.status_code
+    return len(body), peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--content-kb", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    app = make_app()
+    client = app.test_client()
+    client.post("/api/clients", json={"name": "Bench Client", "email": "bench@example.com"})
+    client_id = client.get("/api/clients?limit=1").get_json()["items"][0]["id"]
+    body = ("Lorem ipsum dolor sit amet. " * 40 + "\n") * (args.content_kb * 1024 // 1161 + 1)
+    documents = [{"clientId": client_id, "type": "Report", "content": body} for _ in range(args.documents)]
+    client.post("/api/documents/bulk", json=documents)
+
+    print(f"{args.documents} documents of ~{args.content_kb} KB")
+    print(f"{'view':<10}{'payload':>16}{'peak memory':>16}{'time':>10}")
+    for view, url in (("full", "/api/documents?view=full"), ("summary", "/api/documents")):
+        size, peak, elapsed = measure(client, url)
+        print(f"{view:<10}{size / 1024:>13.1f} KB{peak / 1024:>13.1f} KB{elapsed * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
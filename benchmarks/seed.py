@@ -0,0 +1,33 @@
+"""Seed a benchmark database at a given scale with the synthetic data loader."""
+from sqlalchemy import text
+from app.models import db
+from app.utils.fixtures import STATUS_PLANS, load
+
+# Number of clients per named scale; sessions and documents follow from each client's status
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+STATUSES = tuple(STATUS_PLANS)
+
+
+def counts(app):
+    with app.app_context():
+        return {
+            table: db.session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in ("clients", "sessions", "documents")
+        }
+
+
+def seed(app, clients, seed=0):
+    """Load `clients` clients with their sessions and documents; returns the row counts."""
+    with app.app_context():
+        width = app.extensions['id_allocator'].width
+        with db.engine.begin() as connection:
+            # GET /search is one of the measured endpoints
+            load(connection, clients, seed=seed, width=width, search_index=True)
+    return counts(app)
+
+
+def sample_ids(app, table, size):
+    """Up to `size` random display_ids from table."""
+    with app.app_context():
+        rows = db.session.execute(text(f"SELECT display_id FROM {table} ORDER BY random() LIMIT :size"), {"size": size})
+        return [row[0] for row in rows]
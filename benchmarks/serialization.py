@@ -0,0 +1,100 @@
+"""Serialization cost of list responses: to_dict() + jsonify vs. field plans over Row tuples.
+
+    python -m benchmarks.serialization --clients 2000 --sessions 5 --documents 2 --repeat 5
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from flask import jsonify
+from sqlalchemy.orm import undefer
+from . import make_app
+from app.models import db
+from app.models.client import Client
+from app.models.document import Document
+from app.models.session import Session
+from app.utils.serialization import CLIENT_PLAN, DOCUMENT_PLAN, DOCUMENT_SUMMARY_PLAN, SESSION_PLAN
+
+
+def post_bulk(client, url, items):
+    """POST a bulk request and return the created ids, failing on any rejected item."""
+    summary = client.post(url, json=items).get_json()
+    if summary["failed"]:
+        error = next(r for r in summary["results"] if r["status"] not in (200, 201))
+        raise SystemExit(f"Seeding {url} failed for {summary['failed']} of {len(items)} items, e.g. {error}")
+    return [result["id"] for result in summary["results"]]
+
+
+def seed(client, clients, sessions, documents):
+    ids = post_bulk(client, "/api/clients/bulk", [
+        {"name": f"Client {i}", "email": f"client{i}@example.com", "phone": "555-0100",
+         "source": "Referral", "notes": "Prefers morning sessions."}
+        for i in range(clients)
+    ])
+    start = datetime(2024, 1, 1, 9, 0)
+    post_bulk(client, "/api/sessions/bulk", [
+        {"clientId": cid, "sessionNumber": n, "date": (start + timedelta(days=n)).isoformat(),
+         "notes": "Discussed goals and next steps."}
+        for cid in ids for n in range(1, sessions + 1)
+    ])
+    post_bulk(client, "/api/documents/bulk", [
+        {"clientId": cid, "type": "Report", "content": "Summary of the session. " * 20}
+        for cid in ids for _ in range(documents)
+    ])
+
+
+def best_of(repeat, fn):
+    timings = []
+    body = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=5, help="sessions per client")
+    parser.add_argument("--documents", type=int, default=2, help="documents per client")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    app = make_app()
+    seed(app.test_client(), args.clients, args.sessions, args.documents)
+
+    cases = [
+        ("clients", lambda: [c.to_dict() for c in Client.query.order_by(Client.id)], CLIENT_PLAN, Client),
+        ("sessions", lambda: [s.to_dict() for s in Session.with_client().order_by(Session.id)], SESSION_PLAN, Session),
+        ("documents", lambda: [d.to_summary_dict() for d in Document.with_client().order_by(Document.id)],
+         DOCUMENT_SUMMARY_PLAN, Document),
+        ("documents (full)", lambda: [d.to_dict() for d in Document.with_client().options(undefer(Document.content)).order_by(Document.id)],
+         DOCUMENT_PLAN, Document),
+    ]
+
+    print(f"{args.clients} clients, {args.sessions} sessions and {args.documents} documents each; best of {args.repeat}")
+    print(f"{'list':<18}{'rows':>8}{'to_dict':>12}{'plan':>12}{'speedup':>10}")
+    with app.test_request_context():
+        for name, to_dicts, plan, model in cases:
+            # Each run starts from an empty identity map, as a request would
+            def baseline():
+                body = jsonify(to_dicts()).get_data()
+                db.session.expunge_all()
+                return body
+
+            def planned():
+                return jsonify(plan.rows(plan.query().order_by(model.id).all())).get_data()
+
+            old, expected = best_of(args.repeat, baseline)
+            new, body = best_of(args.repeat, planned)
+            assert body == expected, f"{name}: field plan output differs from to_dict()"
+            rows = expected.count(b'"id":')
+            if rows == 0:
+                raise SystemExit(f"{name}: the seeded list is empty, so there is nothing to measure")
+            print(f"{name:<18}{rows:>8}{old * 1000:>10.1f}ms{new * 1000:>10.1f}ms{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,3 +5,52 @@ db_path = os.path.join(BASE_DIR, "mydatabase.db")
 
 SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
 
+# SQLite engine profile: pragmas run on every new connection; GET/HEAD requests use a
+# separate pool of read-only connections while writes share one pooled writer
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,
+    "cache_size": -64000,
+    "busy_timeout": 5000,
+    "foreign_keys": "ON",
+}
+SQLITE_READ_POOL_SIZE = 4
+
+# Apply pending schema migrations when the app starts
+AUTO_MIGRATE = True
+
+# In-process entity caches: maximum entries per cache and entry lifetime in seconds.
+# Document bodies are never cached, so an entry stays a small metadata dict
+ENTITY_CACHE_SIZE = 10000
+ENTITY_CACHE_TTL = 300
+
+# iCal feeds: assumed session length and how far back past sessions are included
+ICS_SESSION_MINUTES = 60
+ICS_PAST_DAYS = 30
+
+# Response compression: smallest body worth compressing, zlib level, and the
+# number of compressed bodies kept per ETag for repeated responses
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 6
+COMPRESS_CACHE_SIZE = 256
+
+# Per-handler request metrics served at /metrics in the Prometheus text format
+METRICS_ENABLED = True
+
+# SQL profiling. With SQL_PROFILING on, statements slower than SQL_SLOW_QUERY_MS are logged
+# with their EXPLAIN QUERY PLAN, and a statement run SQL_REPEAT_THRESHOLD or more times in
+# one request is logged as a possible N+1. Setting SQL_QUERY_BUDGET (e.g. in tests) makes
+# any request that runs more statements than that fail, or with SQL_QUERY_BUDGET_STRICT off,
+# only logs it. Either way the response carries an X-SQL-Query-Budget-Exceeded header.
+SQL_PROFILING = False
+SQL_SLOW_QUERY_MS = 100
+SQL_REPEAT_THRESHOLD = 10
+SQL_EXPLAIN_SLOW_QUERIES = True
+SQL_QUERY_BUDGET = None
+SQL_QUERY_BUDGET_STRICT = True
+
+# display_id allocation: numbers reserved per sequence round trip, and zero-padding width.
+# Changing the width only affects new ids; existing display_ids are never rewritten
+ID_BLOCK_SIZE = 50
+DISPLAY_ID_WIDTH = 8
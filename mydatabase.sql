@@ -39,24 +39,20 @@ CREATE TABLE documents (
     FOREIGN KEY (client_id) REFERENCES clients(id)
 );
 
--- Triggers to generate display_id values
-CREATE TRIGGER generate_client_display_id AFTER INSERT ON clients
-BEGIN
-    UPDATE clients 
-    SET display_id = 'CLIENT-' || substr('000' || new.id, -3, 3)
-    WHERE id = new.id;
-END;
+-- Indexes for per-client listings and the list endpoints' filters and sorts
+CREATE INDEX ix_sessions_client_id_date ON sessions (client_id, date);
+CREATE INDEX ix_sessions_date ON sessions (date);
+CREATE INDEX ix_documents_client_id ON documents (client_id);
+CREATE INDEX ix_documents_sent ON documents (sent);
+CREATE INDEX ix_clients_status ON clients (status);
+CREATE INDEX ix_clients_name ON clients (name);
+CREATE INDEX ix_clients_source ON clients (source);
+CREATE INDEX ix_clients_created_at ON clients (created_at);
+CREATE INDEX ix_sessions_category ON sessions (category);
+CREATE INDEX ix_sessions_completed_date ON sessions (completed, date);
+CREATE INDEX ix_documents_type ON documents (type);
+CREATE INDEX ix_documents_sent_date ON documents (sent_date);
+CREATE INDEX ix_documents_created_at ON documents (created_at);
 
-CREATE TRIGGER generate_session_display_id AFTER INSERT ON sessions
-BEGIN
-    UPDATE sessions 
-    SET display_id = 'SESSION-' || substr('000' || new.id, -3, 3)
-    WHERE id = new.id;
-END;
-
-CREATE TRIGGER generate_document_display_id AFTER INSERT ON documents
-BEGIN
-    UPDATE documents 
-    SET display_id = 'DOCUMENT-' || substr('000' || new.id, -3, 3)
-    WHERE id = new.id;
-END;
+-- display_id values are allocated by the application from the id_sequences table,
+-- which the migration runner creates and seeds from the existing rows.
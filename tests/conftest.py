@@ -0,0 +1,32 @@
+import logging
+import pytest
+import config
+from app import create_app
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def app(tmp_path):
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "SQLITE_PRAGMAS": config.SQLITE_PRAGMAS,
+        "AUTO_MIGRATE": True,
+    }
+    return create_app(type("TestConfig", (), settings))
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def client_id(client):
+    response = client.post("/api/clients", json={"name": "Test Client", "email": "test@example.com"})
+    return response.get_json()["id"]
@@ -0,0 +1,60 @@
+import json
+
+
+def test_mixed_creates_updates_and_item_errors(client, client_id):
+    before = client.get(f"/api/clients/{client_id}").get_json()
+
+    response = client.post("/api/clients/bulk", json=[
+        {"name": "New Client", "email": "new@example.com"},
+        {"id": client_id, "phone": "555-0199", "notes": "Moved to weekly sessions"},
+        {"id": "CLIENT-999", "phone": "555-0100"},
+        {"name": "No Email"},
+        {"name": "Duplicate", "email": "test@example.com"},
+        "not an object",
+    ])
+
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert (summary["succeeded"], summary["failed"]) == (2, 4)
+    assert [(r["index"], r["status"]) for r in summary["results"]] == [(0, 201), (1, 200), (2, 404), (3, 400), (4, 409), (5, 400)]
+
+    created = client.get(f"/api/clients/{summary['results'][0]['id']}").get_json()
+    assert (created["name"], created["email"]) == ("New Client", "new@example.com")
+    updated = client.get(f"/api/clients/{client_id}").get_json()
+    assert (updated["phone"], updated["notes"], updated["name"]) == ("555-0199", "Moved to weekly sessions", before["name"])
+    assert updated["updatedAt"] != before["updatedAt"]
+
+
+def test_bulk_update_changes_the_etag(client, client_id):
+    etag = client.get(f"/api/clients/{client_id}").headers["ETag"]
+    client.post("/api/clients/bulk", json=[{"id": client_id, "status": "Info Shared"}])
+
+    assert client.get(f"/api/clients/{client_id}", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_ndjson_input(client, client_id):
+    lines = [
+        {"clientId": client_id, "sessionNumber": 1, "date": "2024-03-01T10:00:00"},
+        {"clientId": "CLIENT-999", "sessionNumber": 1, "date": "2024-03-01T10:00:00"},
+        {"clientId": client_id, "sessionNumber": 2, "date": "next tuesday"},
+        {"clientId": client_id, "sessionNumber": 2, "date": "2024-03-08T10:00:00", "notes": "Bring the CV"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n\n"
+
+    response = client.post("/api/sessions/bulk", data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert [r["status"] for r in summary["results"]] == [201, 404, 400, 201]
+    sessions = client.get(f"/api/clients/{client_id}/sessions").get_json()
+    assert sorted((s["sessionNumber"], s["notes"]) for s in sessions) == [(1, None), (2, "Bring the CV")]
+
+
+def test_invalid_ndjson_line_rejects_the_request(client, client_id):
+    body = json.dumps({"name": "One", "email": "one@example.com"}) + "\n{not json\n"
+
+    response = client.post("/api/clients/bulk", data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid JSON on line 2"}
+    assert [c["id"] for c in client.get("/api/clients").get_json()] == [client_id]
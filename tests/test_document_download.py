@@ -0,0 +1,54 @@
+"""A download in progress keeps sending the version of the document it started with."""
+import gzip
+import random
+import pytest
+
+# Random words compress poorly, so the stored body spans several download chunks
+WORDS = [f"word{i}" for i in range(5000)]
+
+
+def body(seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(40_000))
+
+
+@pytest.fixture
+def document(client, client_id):
+    content = body(1)
+    response = client.post("/api/documents", json={"clientId": client_id, "type": "Session Summary", "content": content})
+    return response.get_json()["id"], content
+
+
+def read_with_update_between(client, url, document_id, headers=None):
+    response = client.get(url, headers=headers or {}, buffered=False)
+    assert response.status_code == 200
+    chunks = response.iter_encoded()
+    first = next(chunks)
+    update = client.put(f"/api/documents/{document_id}", json={"content": body(2)})
+    assert update.status_code == 200
+    data = first + b"".join(chunks)
+    response.close()
+    return response, data
+
+
+def test_identity_download_is_not_mixed_with_a_concurrent_update(client, document):
+    document_id, content = document
+    response, data = read_with_update_between(client, f"/api/documents/{document_id}/download", document_id)
+    assert data.decode("utf-8") == content
+    assert int(response.headers["Content-Length"]) == len(data)
+
+
+def test_stored_gzip_download_is_not_mixed_with_a_concurrent_update(client, document):
+    document_id, content = document
+    response, data = read_with_update_between(
+        client, f"/api/documents/{document_id}/download", document_id, {"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(data).decode("utf-8") == content
+
+
+def test_range_download_reads_the_requested_bytes(client, document):
+    document_id, content = document
+    response = client.get(f"/api/documents/{document_id}/download", headers={"Range": "bytes=70000-140009"})
+    assert response.status_code == 206
+    assert response.get_data() == content.encode("utf-8")[70000:140010]
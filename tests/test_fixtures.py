@@ -0,0 +1,47 @@
+from sqlalchemy import text
+from app.models import db
+from app.utils.fixtures import STATUS_PLANS, load
+
+
+def load_clients(app, clients, **options):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            return load(connection, clients, seed=7, width=app.extensions['id_allocator'].width, **options)
+
+
+def search_hits(client, q):
+    return client.get(f"/api/search?q={q}&limit=100").get_json()["items"]
+
+
+def test_documents_sent_follow_client_status(app):
+    load_clients(app, 300)
+    with app.app_context():
+        rows = db.session.execute(text(
+            "SELECT c.status, d.type, d.sent, d.sent_date FROM documents d JOIN clients c ON c.id = d.client_id"
+        )).all()
+
+    assert {row.sent for row in rows} == {0, 1}
+    for status, kind, sent, sent_date in rows:
+        types, sent_documents = STATUS_PLANS[status][2:]
+        assert sent == (types.index(kind) < sent_documents)
+        assert (sent_date is not None) == bool(sent)
+
+
+def test_search_index_is_deferred_until_rebuild(app, client):
+    load_clients(app, 50)
+    assert search_hits(client, "career") == []
+    client.post("/api/sessions/SESSION-00000001/notes", json={"notes": "Rehearsed salary negotiation."})
+
+    result = app.test_cli_runner().invoke(args=["search", "rebuild"])
+    assert result.exit_code == 0
+    assert {hit["type"] for hit in search_hits(client, "career")} == {"client", "session", "document"}
+    assert [hit["id"] for hit in search_hits(client, "negotiation")] == ["SESSION-00000001"]
+
+
+def test_search_index_in_the_load_transaction(app, client):
+    load_clients(app, 50, search_index=True)
+    hits = search_hits(client, "career")
+    assert hits
+
+    app.test_cli_runner().invoke(args=["search", "rebuild"])
+    assert search_hits(client, "career") == hits
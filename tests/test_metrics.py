@@ -0,0 +1,46 @@
+"""Streamed responses are recorded when the server closes them, whether or not the body was read.
+
+The test client leaves closing an unbuffered response to the caller, as a WSGI server would do it.
+"""
+import re
+import pytest
+
+HANDLER = "client_routes.get_clients"
+
+
+def sample(client, name):
+    text = client.get("/metrics").get_data(as_text=True)
+    match = re.search(rf'^mylo_{name}{{handler="{HANDLER}"}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def in_flight(client):
+    text = client.get("/metrics").get_data(as_text=True)
+    # The scrape itself is in flight while it renders
+    return int(re.search(r"^mylo_http_requests_in_flight (\d+)$", text, re.M).group(1)) - 1
+
+
+@pytest.mark.parametrize("request_body", [
+    pytest.param(lambda client: client.head("/api/clients").close(), id="head"),
+    pytest.param(lambda client: client.get("/api/clients", buffered=False).close(), id="unread-get"),
+    pytest.param(
+        lambda client: client.get("/api/clients", buffered=False, headers={"Accept-Encoding": "gzip"}).close(),
+        id="unread-gzip-get",
+    ),
+])
+def test_streamed_response_is_recorded_without_reading_the_body(client, client_id, request_body):
+    for _ in range(3):
+        request_body(client)
+
+    assert sample(client, "http_request_duration_seconds_count") == 3
+    assert sample(client, "db_statements_per_request_count") == 3
+    assert sample(client, "db_statements_total") > 0
+    assert in_flight(client) == 0
+
+
+def test_read_streamed_response_counts_its_size(client, client_id):
+    with client.get("/api/clients") as response:
+        body = response.get_data()
+
+    assert sample(client, "http_response_size_bytes_sum") == len(body)
+    assert sample(client, "http_request_duration_seconds_count") == 1
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from app.models import db
+
+
+def etag_of(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def test_stale_if_match_is_rejected(client, client_id):
+    url = f"/api/clients/{client_id}"
+    stale = etag_of(client, url)
+    assert client.put(url, json={"phone": "555-0101"}, headers={"If-Match": stale}).status_code == 200
+
+    response = client.put(url, json={"phone": "555-0102"}, headers={"If-Match": stale})
+
+    assert response.status_code == 412
+    assert response.headers["ETag"] == etag_of(client, url)
+    assert client.get(url).get_json()["phone"] == "555-0101"
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_compressed_etag_variants_match(client, client_id, encoding):
+    url = f"/api/clients/{client_id}"
+    variant = '"{}-{}"'.format(etag_of(client, url).strip('"'), encoding)
+
+    assert client.get(url, headers={"If-None-Match": variant}).status_code == 304
+    assert client.put(url, json={"phone": "555-0101"}, headers={"If-Match": variant}).status_code == 200
+    assert client.put(url, json={"phone": "555-0102"}, headers={"If-Match": variant}).status_code == 412
+
+
+@pytest.fixture
+def race(app):
+    """Commit a version bump from another connection just before the request's next flush."""
+    other = create_engine(app.config["SQLALCHEMY_DATABASE_URI"])
+
+    def arm(display_id):
+        @event.listens_for(db.session, "before_flush", once=True)
+        def concurrent_write(session, flush_context, instances):
+            with other.begin() as connection:
+                connection.execute(
+                    text("UPDATE clients SET version = version + 1 WHERE display_id = :id"), {"id": display_id}
+                )
+
+    yield arm
+    other.dispose()
+
+
+@pytest.mark.parametrize("if_match, status", [(True, 412), (False, 409)])
+def test_version_race_at_flush(client, client_id, race, if_match, status):
+    url = f"/api/clients/{client_id}"
+    headers = {"If-Match": etag_of(client, url)} if if_match else {}
+    race(client_id)
+
+    response = client.put(url, json={"phone": "555-0199"}, headers=headers)
+
+    assert response.status_code == status
+    assert response.get_json() == {"error": "Client was modified by another request"}
+    assert client.get(url).get_json()["phone"] != "555-0199"
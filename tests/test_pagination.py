@@ -0,0 +1,59 @@
+import base64
+import pytest
+from app.models import db
+from app.utils.fixtures import load
+from app.utils.pagination import encode_cursor
+
+
+@pytest.fixture
+def loaded(app):
+    # Drafts have no sentDate, and a client's summary and assessment share theirs
+    with app.app_context():
+        with db.engine.begin() as connection:
+            load(connection, 60, seed=3, width=app.extensions['id_allocator'].width)
+    return app
+
+
+def walk(client, url, limit):
+    ids, after, pages = [], None, 0
+    while True:
+        response = client.get(f"{url}&limit={limit}" + (f"&after={after}" if after else ""))
+        assert response.status_code == 200
+        page = response.get_json()
+        ids.extend(item["id"] for item in page["items"])
+        pages += 1
+        after = page["nextCursor"]
+        if after is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("sort", ["sentDate", "-sentDate"])
+def test_pages_over_a_nullable_sort_key(loaded, sort):
+    client = loaded.test_client()
+    everything = client.get(f"/api/documents?sort={sort}").get_json()
+    assert any(item["sentDate"] is None for item in everything)
+    assert any(item["sentDate"] is not None for item in everything)
+
+    ids, pages = walk(client, f"/api/documents?sort={sort}", 7)
+
+    assert len(ids) == len(set(ids))
+    assert ids == [item["id"] for item in everything]
+    assert pages > 1
+
+
+@pytest.mark.parametrize("url, after", [
+    ("/api/clients?", "not a cursor"),
+    ("/api/clients?", base64.urlsafe_b64encode(b'{"id": 1}').decode()),
+    ("/api/clients?", encode_cursor([])),
+    ("/api/clients?", encode_cursor(["CLIENT-001"])),
+    ("/api/clients?", encode_cursor([True])),
+    ("/api/clients?", encode_cursor([1, 2])),
+    ("/api/documents?sort=sentDate", encode_cursor(["2024-01-01 09:00:00.000000"])),
+    ("/api/documents?sort=sentDate", encode_cursor([20240101, 1])),
+    ("/api/documents?sort=-sentDate", encode_cursor(["2024-01-01 09:00:00.000000", "1"])),
+    ("/api/documents?sort=-sentDate", encode_cursor([None, None])),
+])
+def test_malformed_cursor_is_rejected(client, client_id, url, after):
+    response = client.get(f"{url}&after={after}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
@@ -0,0 +1,80 @@
+"""The session and document list endpoints run the same number of SQL statements however many rows they return."""
+import logging
+import pytest
+from sqlalchemy import event
+import config
+from app import create_app
+from app.models import db
+
+SMALL, LARGE = 1, 10
+
+
+def make_app(db_path):
+    settings = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}", "SQLITE_PRAGMAS": config.SQLITE_PRAGMAS, "AUTO_MIGRATE": True}
+    return create_app(type("TestConfig", (), settings))
+
+
+def seed(client, clients):
+    """`clients` clients, each with `clients` sessions and documents; returns the first client's display_id."""
+    response = client.post("/api/clients/bulk", json=[
+        {"name": f"Client {i}", "email": f"client{i}@example.com"} for i in range(clients)
+    ])
+    ids = [result["id"] for result in response.get_json()["results"]]
+    client.post("/api/sessions/bulk", json=[
+        {"clientId": cid, "sessionNumber": n + 1, "date": f"2025-01-{n % 28 + 1:02d}T10:00:00"}
+        for cid in ids for n in range(clients)
+    ])
+    client.post("/api/documents/bulk", json=[
+        {"clientId": cid, "type": "Session Summary", "content": f"Summary {n}"}
+        for cid in ids for n in range(clients)
+    ])
+    return ids[0]
+
+
+def count_statements(app, client, url):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url)
+        # Unpaginated lists stream, running their queries while the body is read
+        response.get_data()
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements)
+
+
+def statement_counts(tmp_path, clients):
+    logging.disable(logging.INFO)
+    app = make_app(tmp_path / f"{clients}.db")
+    client = app.test_client()
+    client_id = seed(client, clients)
+    urls = [
+        "/api/sessions",
+        "/api/sessions?limit=50",
+        "/api/documents",
+        "/api/documents?limit=50",
+        f"/api/clients/{client_id}/sessions",
+        f"/api/clients/{client_id}/documents",
+    ]
+    return {url.replace(client_id, "<id>"): count_statements(app, client, url) for url in urls}
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def test_list_query_counts_do_not_grow_with_rows(tmp_path):
+    small = statement_counts(tmp_path, SMALL)
+    large = statement_counts(tmp_path, LARGE)
+    assert large == small
@@ -0,0 +1,15 @@
+"""Search snippets are safe to render as HTML."""
+
+
+def test_snippet_escapes_stored_text_and_marks_matches(client, client_id):
+    notes = 'Wants <script>alert("x")</script> & <img src=x onerror=alert(1)> coaching'
+    client.put(f"/api/clients/{client_id}", json={"notes": notes})
+
+    response = client.get("/api/search", query_string={"q": "coaching"})
+
+    assert response.status_code == 200
+    [result] = response.get_json()["items"]
+    snippet = result["snippet"]
+    assert "<script>" not in snippet and "<img" not in snippet
+    assert "&lt;script&gt;" in snippet and "&amp;" in snippet
+    assert snippet.endswith("<mark>coaching</mark>")
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from app.models import db
+
+
+@pytest.fixture
+def session_id(client, client_id):
+    date = (datetime.utcnow() + timedelta(days=2)).isoformat()
+    response = client.post("/api/sessions", json={
+        "clientId": client_id, "sessionNumber": 1, "date": date, "notes": "Agreed on goals.",
+    })
+    return response.get_json()["id"]
+
+
+def stored_row(app, session_id):
+    with app.app_context():
+        return db.session.execute(
+            text("SELECT version, updated_at FROM sessions WHERE display_id = :id"), {"id": session_id}
+        ).one()
+
+
+def test_append_leaves_the_session_row_alone(app, client, session_id):
+    before = stored_row(app, session_id)
+
+    response = client.post(f"/api/sessions/{session_id}/notes", json={"notes": "Sent the reading list."})
+
+    assert response.status_code == 200
+    assert response.get_json()["notes"] == "Agreed on goals.\nSent the reading list."
+    assert stored_row(app, session_id) == before
+
+
+def test_append_changes_the_validators(client, client_id, session_id):
+    urls = [
+        f"/api/sessions/{session_id}",
+        f"/api/clients/{client_id}/sessions",
+        "/api/sessions",
+        f"/api/clients/{client_id}/sessions.ics",
+    ]
+    etags = {url: client.get(url).headers["ETag"] for url in urls}
+
+    appended = client.post(f"/api/sessions/{session_id}/notes", json={"notes": "Sent the reading list."})
+
+    for url, etag in etags.items():
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200, url
+        assert b"Sent the reading list." in response.data
+    current = client.get(urls[0])
+    assert current.headers["ETag"] == appended.headers["ETag"]
+    assert client.get(urls[0], headers={"If-None-Match": current.headers["ETag"]}).status_code == 304
+
+
+def test_if_match_on_append(client, session_id):
+    url = f"/api/sessions/{session_id}/notes"
+    etag = client.get(f"/api/sessions/{session_id}").headers["ETag"]
+
+    first = client.post(url, json={"notes": "One."}, headers={"If-Match": etag})
+    assert first.status_code == 200
+    assert client.post(url, json={"notes": "Two."}, headers={"If-Match": etag}).status_code == 412
+    assert client.post(url, json={"notes": "Two."}, headers={"If-Match": first.headers["ETag"]}).status_code == 200
+    assert client.get(f"/api/sessions/{session_id}").get_json()["notes"] == "Agreed on goals.\nOne.\nTwo."
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+
+def add_session(client, client_id, number, days, completed=False):
+    date = (datetime.utcnow() + timedelta(days=days)).isoformat()
+    response = client.post("/api/sessions", json={
+        "clientId": client_id, "sessionNumber": number, "date": date, "completed": completed,
+    })
+    assert response.status_code == 201
+    return response.get_json()["id"]
+
+
+def test_overdue_sessions_are_not_upcoming(client, client_id):
+    add_session(client, client_id, 1, -10, completed=True)
+    missed = add_session(client, client_id, 2, -3)
+    add_session(client, client_id, 3, 4)
+    add_session(client, client_id, 4, 11)
+
+    assert client.get("/api/stats").get_json()["sessions"] == {
+        "total": 4, "completed": 1, "upcoming": 2, "overdue": 1,
+    }
+
+    client.put(f"/api/sessions/{missed}", json={"completed": True})
+    assert client.get("/api/stats").get_json()["sessions"] == {
+        "total": 4, "completed": 2, "upcoming": 2, "overdue": 0,
+    }